@@ -0,0 +1,136 @@
+"""Пропускная способность цепочки опрос → проверка → разбор → отправка.
+
+Запускает подмены API Практикума и Телеграма в отдельном процессе
+и гоняет через них настоящий PollingEngine для N подписок:
+
+    python benchmarks/bench_pipeline.py --tenants 1000 --duration 30
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from benchmarks.servers import serve  # noqa: E402
+from delivery import DeliveryQueue  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from http_pool import ConnectionStats, create_session  # noqa: E402
+from scheduling import FixedPolicy  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+
+def free_port():
+    """Свободный локальный TCP-порт."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb():
+    """Текущий RSS процесса в мегабайтах."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(values, fraction):
+    """Перцентиль fraction значений values или nan без значений."""
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run_pipeline(base_url, args):
+    """Гоняет движок против заглушек API и возвращает замеры."""
+    homework.ENDPOINT = f'{base_url}/api/user_api/homework_statuses/'
+    homework.TELEGRAM_API = base_url + '/bot{token}/{method}'
+    stats = ConnectionStats()
+    tenants = [Tenant(f'token-{number}', str(number))
+               for number in range(args.tenants)]
+    async with create_session(
+        stats, pool_size=args.pool_size, pool_per_host=args.pool_size
+    ) as session:
+        delivery = DeliveryQueue(
+            session, 'bench', global_rate=args.global_rate)
+        engine = PollingEngine(
+            session, 'bench', tenants, retry_time=args.poll_interval,
+            concurrency=args.concurrency,
+            policy=FixedPolicy(args.poll_interval), delivery=delivery)
+        delivery_task = asyncio.create_task(delivery.run())
+        engine_task = asyncio.create_task(engine.run_forever())
+        started_at = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started_at
+        engine_task.cancel()
+        delivery_task.cancel()
+        async with session.get(f'{base_url}/stats') as response:
+            result = await response.json()
+    return elapsed, stats, result
+
+
+def main():
+    """Разбирает аргументы, запускает прогон и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--poll-interval', type=float, default=5)
+    parser.add_argument('--change-interval', type=float, default=20)
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--pool-size', type=int, default=100)
+    parser.add_argument('--global-rate', type=float, default=1000)
+    parser.add_argument('--practicum-latency', type=float, default=0.05)
+    parser.add_argument('--practicum-errors', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.05)
+    parser.add_argument('--telegram-errors', type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, daemon=True, args=(port, ready, {
+            'practicum_latency': args.practicum_latency,
+            'practicum_errors': args.practicum_errors,
+            'telegram_latency': args.telegram_latency,
+            'telegram_errors': args.telegram_errors,
+            'change_interval': args.change_interval,
+        }))
+    server.start()
+    ready.wait(10)
+    rss_before = rss_mb()
+    try:
+        elapsed, stats, result = asyncio.run(
+            run_pipeline(f'http://127.0.0.1:{port}', args))
+    finally:
+        server.terminate()
+    latencies = result['latencies']
+    print(f'подписок: {args.tenants}, длительность: {elapsed:.1f} с')
+    print(f'опросов/с: {result["practicum_requests"] / elapsed:.1f} '
+          f'(ошибок API: {result["practicum_errors"]})')
+    print(f'отправок/с: {result["telegram_requests"] / elapsed:.1f} '
+          f'(ошибок Telegram: {result["telegram_errors"]})')
+    print(f'уведомлений: {len(latencies)}, задержка p50: '
+          f'{percentile(latencies, 0.5):.3f} с, '
+          f'p99: {percentile(latencies, 0.99):.3f} с, '
+          f'средняя: {statistics.fmean(latencies) if latencies else 0:.3f} с')
+    print(f'RSS: {rss_before:.1f} → {rss_mb():.1f} МБ '
+          f'(pid {os.getpid()})')
+    print(f'пул HTTP-соединений: {stats}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Воспроизведение записанного трафика через PollingEngine.
+
+Журнал пишет бот с RECORD_FILE=traffic.jsonl.gz. Здесь он
+проигрывается на виртуальных часах, а отправки сравниваются с
+записанными: так видно, как смена расписания или сравнения статусов
+меняет число опросов и задержку уведомлений:
+
+    python benchmarks/bench_replay.py traffic.jsonl.gz --policy fixed
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+from collections import Counter
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from replay import load_traffic, replay  # noqa: E402
+from scheduling import AdaptivePolicy, FixedPolicy  # noqa: E402
+
+POLICIES = {'adaptive': AdaptivePolicy, 'fixed': FixedPolicy}
+
+
+def percentile(values, share):
+    """Перцентиль share непустого списка values."""
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def main():
+    """Проигрывает журнал трафика и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('traffic')
+    parser.add_argument('--policy', choices=POLICIES, default='adaptive')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    events = load_traffic(args.traffic)
+    kinds = Counter(event['k'] for event in events)
+    result = asyncio.run(replay(events, policy=POLICIES[args.policy]()))
+    print(f'в журнале: подписок {kinds["tenant"]}, опросов {kinds["poll"]}, '
+          f'отправок {kinds["send"]}')
+    print(f'воспроизведено: опросов {result.polls}, '
+          f'отправок {result.sent}')
+    print(f'уведомления: совпало {result.matched}, '
+          f'пропущено {result.missed}, лишних {result.extra}')
+    if result.delays:
+        print(f'задержка относительно записи: медиана '
+              f'{statistics.median(result.delays):.1f} с, '
+              f'p95 {percentile(result.delays, 0.95):.1f} с')
+    print(f'{result.virtual_seconds:.0f} с трафика за '
+          f'{result.wall_seconds:.2f} с, ускорение '
+          f'{result.virtual_seconds / max(result.wall_seconds, 1e-9):.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Время холодного старта воркера: импорт и первый опрос API.
+
+Запускает воркер в отдельном процессе против локальных подмен API
+Практикума и Телеграма и замеряет, сколько проходит от запуска
+процесса до первого запроса к homework_statuses:
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.bench_pipeline import free_port  # noqa: E402
+from benchmarks.servers import serve  # noqa: E402
+
+# Код воркера: печатает время импорта homework и запускает main().
+WORKER = '''
+import sys
+import time
+started = time.perf_counter()
+import homework
+print(time.perf_counter() - started, flush=True)
+homework.ENDPOINT = sys.argv[1] + '/api/user_api/homework_statuses/'
+homework.TELEGRAM_API = sys.argv[1] + '/bot{token}/{method}'
+homework.main()
+'''
+POLL_INTERVAL = 0.002
+
+
+def practicum_requests(base_url):
+    """Сколько запросов к API приняла заглушка Практикума."""
+    with urllib.request.urlopen(f'{base_url}/stats') as response:
+        return json.load(response)['practicum_requests']
+
+
+def measure(base_url, workdir):
+    """Одна попытка: (время импорта, время до первого опроса) в секундах."""
+    environ = dict(
+        os.environ, PYTHONPATH=ROOT, PRACTICUM_TOKEN='bench',
+        TELEGRAM_TOKEN='bench', TELEGRAM_CHAT_ID='1')
+    environ.pop('TENANTS_FILE', None)
+    before = practicum_requests(base_url)
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, '-c', WORKER, base_url], cwd=workdir, env=environ,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        while practicum_requests(base_url) == before:
+            if worker.poll() is not None:
+                raise RuntimeError('Воркер завершился до первого опроса')
+            time.sleep(POLL_INTERVAL)
+        first_poll = time.perf_counter() - started
+    finally:
+        worker.terminate()
+        output, _ = worker.communicate()
+    return float(output.split()[0]), first_poll
+
+
+def main():
+    """Замеряет холодный старт и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    port = free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, daemon=True, args=(port, ready, {
+            'practicum_latency': 0, 'practicum_errors': 0,
+            'telegram_latency': 0, 'telegram_errors': 0,
+            'change_interval': 3600,
+        }))
+    server.start()
+    ready.wait(10)
+    base_url = f'http://127.0.0.1:{port}'
+    imports, first_polls = [], []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for _ in range(args.runs):
+                import_time, first_poll = measure(base_url, workdir)
+                imports.append(import_time)
+                first_polls.append(first_poll)
+    finally:
+        server.terminate()
+    print(f'запусков: {args.runs}')
+    print(f'импорт homework: медиана {statistics.median(imports):.3f} с, '
+          f'максимум {max(imports):.3f} с')
+    print(f'до первого опроса: медиана '
+          f'{statistics.median(first_polls):.3f} с, '
+          f'максимум {max(first_polls):.3f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Локальные подмены API Практикума и Bot API Телеграма для бенчмарков.
+
+Сервер Практикума меняет статус работы каждого токена раз в
+change_interval секунд со случайной фазой и запоминает момент смены.
+Сервер Телеграма по названию работы в тексте сообщения считает
+задержку от смены статуса до получения уведомления.
+"""
+import asyncio
+import random
+import re
+import time
+
+from aiohttp import web
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+HOMEWORK_NAME = re.compile(r'"(hw-[^"]+)"')
+
+
+class PracticumStandIn:
+    """Подмена эндпоинта homework_statuses с задержкой и ошибками."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, change_interval=30.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.change_interval = change_interval
+        self.started_at = time.time()
+        self.phases = {}
+        self.requests = 0
+        self.errors = 0
+
+    def _phase(self, token):
+        phase = self.phases.get(token)
+        if phase is None:
+            phase = self.phases[token] = (
+                random.random() * self.change_interval)
+        return phase
+
+    def last_change(self, token, now=None):
+        """Номер и момент последней смены статуса работы токена."""
+        now = time.time() if now is None else now
+        phase = self._phase(token)
+        version = int((now - self.started_at + phase) // self.change_interval)
+        changed_at = (
+            self.started_at - phase + version * self.change_interval)
+        return version, changed_at
+
+    async def homework_statuses(self, request):
+        """Отвечает как API Практикума: статусы работ токена."""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({}, status=500)
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        from_date = int(request.query['from_date'])
+        now = time.time()
+        version, changed_at = self.last_change(token, now)
+        homeworks = []
+        if version > 0 and changed_at >= from_date - 1:
+            homeworks.append({
+                'id': token,
+                'homework_name': f'hw-{token}',
+                'status': STATUSES[version % len(STATUSES)],
+            })
+        return web.json_response(
+            {'homeworks': homeworks, 'current_date': int(now)})
+
+
+class TelegramStandIn:
+    """Подмена sendMessage, измеряющая задержку уведомлений."""
+
+    def __init__(self, practicum, latency=0.0, error_rate=0.0):
+        self.practicum = practicum
+        self.latency = latency
+        self.error_rate = error_rate
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+
+    async def send_message(self, request):
+        """Принимает сообщение как Bot API."""
+        self.requests += 1
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response(
+                {'ok': False, 'description': 'Too Many Requests'},
+                status=429)
+        now = time.time()
+        for name in HOMEWORK_NAME.findall(payload['text']):
+            _, changed_at = self.practicum.last_change(name[len('hw-'):], now)
+            self.latencies.append(now - changed_at)
+        return web.json_response({'ok': True, 'result': {}})
+
+
+def build_app(practicum, telegram):
+    """Приложение aiohttp с обеими подменами и /stats."""
+    async def stats(request):
+        return web.json_response({
+            'practicum_requests': practicum.requests,
+            'practicum_errors': practicum.errors,
+            'telegram_requests': telegram.requests,
+            'telegram_errors': telegram.errors,
+            'latencies': telegram.latencies,
+        })
+
+    app = web.Application()
+    app.router.add_get(
+        '/api/user_api/homework_statuses/', practicum.homework_statuses)
+    app.router.add_post('/bot{token}/sendMessage', telegram.send_message)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def serve(port, ready, options):
+    """Точка входа дочернего процесса с подменами."""
+    practicum = PracticumStandIn(
+        options['practicum_latency'], options['practicum_errors'],
+        options['change_interval'])
+    telegram = TelegramStandIn(
+        practicum, options['telegram_latency'], options['telegram_errors'])
+
+    async def main():
+        runner = web.AppRunner(build_app(practicum, telegram))
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from http import HTTPStatus
+
+from exceptions import (CircuitOpenError, NotStatusOkException,
+                        SendMessageError)
+from metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+# Столько сбоев подряд размыкают предохранитель.
+FAILURE_THRESHOLD = 5
+# Через сколько секунд после размыкания пробуем один вызов.
+RESET_TIMEOUT = 30
+# Каждая неудачная проба удваивает паузу, но не дальше этого предела.
+MAX_RESET_TIMEOUT = 600
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_upstream_failure(error):
+    """Говорит ли ошибка о том, что сам сервис недоступен.
+
+    Ответы вроде 401 или «чат не найден» относятся к одной подписке
+    и предохранитель не трогают.
+    """
+    if isinstance(error, (NotStatusOkException, SendMessageError)):
+        status = error.status
+        return (status is None or status == HTTPStatus.TOO_MANY_REQUESTS
+                or status >= HTTPStatus.INTERNAL_SERVER_ERROR)
+    return isinstance(
+        error, (ConnectionError, asyncio.TimeoutError, json.JSONDecodeError))
+
+
+class CircuitBreaker:
+    """Предохранитель вызовов одного внешнего сервиса.
+
+    Замкнут — вызовы идут как обычно. После FAILURE_THRESHOLD сбоев
+    подряд размыкается и сразу отклоняет вызовы. По истечении паузы
+    пропускает ровно один пробный вызов: удача замыкает его, сбой
+    снова размыкает с удвоенной паузой.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT,
+                 is_failure=is_upstream_failure, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.is_failure = is_failure
+        self.clock = clock
+        self.failures = 0
+        self._trips = 0
+        self._opened_until = 0
+        self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(STATE_CODES[state])
+
+    def allow(self):
+        """Можно ли выполнить вызов сейчас.
+
+        В разомкнутом состоянии по истечении паузы разрешает один
+        пробный вызов; остальные ждут его результата.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock() >= self._opened_until:
+            self._set_state(HALF_OPEN)
+            logging.info('Предохранитель %s: пробный вызов', self.name)
+            return True
+        CIRCUIT_REJECTED.labels(self.name).inc()
+        return False
+
+    def retry_after(self):
+        """Пауза до следующего разрешённого вызова.
+
+        None, пока пробный вызов ещё не завершился.
+        """
+        if self.state == CLOSED:
+            return 0
+        if self.state == HALF_OPEN:
+            return None
+        return max(self._opened_until - self.clock(), 0)
+
+    def record_success(self):
+        """Учитывает удачный вызов."""
+        self.failures = 0
+        if self.state != CLOSED:
+            logging.info('Предохранитель %s замкнут', self.name)
+            self._trips = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        """Учитывает сбой сервиса."""
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self._trip()
+
+    def _trip(self):
+        timeout = min(self.reset_timeout * 2 ** self._trips,
+                      self.max_reset_timeout)
+        self._trips += 1
+        self._opened_until = self.clock() + timeout
+        self._set_state(OPEN)
+        logging.error(
+            'Предохранитель %s разомкнут на %g с', self.name, timeout)
+
+    @contextlib.contextmanager
+    def track(self):
+        """Учитывает исход вызова, разрешённого через allow()."""
+        try:
+            yield
+        except Exception as error:
+            if self.is_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Пробный вызов отменили: следующий вызов снова станет пробой.
+            if self.state == HALF_OPEN:
+                self._opened_until = self.clock()
+                self._set_state(OPEN)
+            raise
+        else:
+            self.record_success()
+
+    async def call(self, factory):
+        """Выполняет корутину factory() через предохранитель."""
+        if not self.allow():
+            raise CircuitOpenError(
+                f'Сервис {self.name} временно недоступен')
+        with self.track():
+            return await factory()
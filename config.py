@@ -0,0 +1,109 @@
+import logging
+import os
+from dataclasses import dataclass
+
+from delivery import GLOBAL_RATE
+from http_pool import KEEPALIVE_TIMEOUT, POOL_PER_HOST, POOL_SIZE
+from rate_limit import PRACTICUM_RATE
+
+# Значения переменных окружения, которые считаем включёнными флагами.
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+@dataclass(frozen=True)
+class Config:
+    """Настройки бота, один раз прочитанные из окружения."""
+
+    practicum_token: str = None
+    telegram_token: str = None
+    telegram_chat_id: str = None
+    tenants_file: str = None
+    cursors_file: str = 'cursors.json'
+    errors_file: str = 'errors.json'
+    store_file: str = None
+    record_file: str = None
+    metrics_port: int = 0
+    shards: int = 1
+    # Общие лимиты запросов к API Практикума и Bot API на весь бот.
+    practicum_rate: float = PRACTICUM_RATE
+    telegram_rate: float = GLOBAL_RATE
+    log_json: bool = False
+    log_async: bool = False
+    log_sample: int = 0
+    http_pool_size: int = POOL_SIZE
+    http_pool_per_host: int = POOL_PER_HOST
+    http_keepalive_timeout: float = KEEPALIVE_TIMEOUT
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Собирает настройки из переменных окружения."""
+        environ = os.environ if environ is None else environ
+        defaults = cls()
+        return cls(
+            practicum_token=environ.get('PRACTICUM_TOKEN'),
+            telegram_token=environ.get('TELEGRAM_TOKEN'),
+            telegram_chat_id=environ.get('TELEGRAM_CHAT_ID'),
+            tenants_file=environ.get('TENANTS_FILE'),
+            cursors_file=environ.get('CURSORS_FILE', defaults.cursors_file),
+            errors_file=environ.get('ERRORS_FILE', defaults.errors_file),
+            store_file=environ.get('STORE_FILE'),
+            record_file=environ.get('RECORD_FILE'),
+            metrics_port=int(environ.get('METRICS_PORT', 0)),
+            shards=int(environ.get('SHARDS', 1)),
+            practicum_rate=float(
+                environ.get('PRACTICUM_RATE', defaults.practicum_rate)),
+            telegram_rate=float(
+                environ.get('TELEGRAM_RATE', defaults.telegram_rate)),
+            log_json=environ.get('LOG_JSON', '') in TRUE_VALUES,
+            log_async=environ.get('LOG_ASYNC', '') in TRUE_VALUES,
+            log_sample=int(environ.get('LOG_SAMPLE', 0)),
+            http_pool_size=int(
+                environ.get('HTTP_POOL_SIZE', defaults.http_pool_size)),
+            http_pool_per_host=int(environ.get(
+                'HTTP_POOL_PER_HOST', defaults.http_pool_per_host)),
+            http_keepalive_timeout=float(environ.get(
+                'HTTP_KEEPALIVE_TIMEOUT', defaults.http_keepalive_timeout)),
+        )
+
+    @property
+    def pool_options(self):
+        """Параметры create_session."""
+        return {
+            'pool_size': self.http_pool_size,
+            'pool_per_host': self.http_pool_per_host,
+            'keepalive_timeout': self.http_keepalive_timeout,
+        }
+
+    @property
+    def shard_rates(self):
+        """Лимиты запросов одного шарда: общие лимиты делятся поровну."""
+        return {
+            'practicum_rate': self.practicum_rate / self.shards,
+            'telegram_rate': self.telegram_rate / self.shards,
+        }
+
+    @property
+    def cursors_dir(self):
+        """Каталог файлов курсоров шардов."""
+        return os.path.dirname(os.path.abspath(self.cursors_file))
+
+    def check_tokens(self):
+        """Проверяет, что заданы токены для работы с одним учеником."""
+        missing = [
+            name for name, value in (
+                ('PRACTICUM_TOKEN', self.practicum_token),
+                ('TELEGRAM_TOKEN', self.telegram_token),
+                ('TELEGRAM_CHAT_ID', self.telegram_chat_id),
+            ) if not value
+        ]
+        for name in missing:
+            logging.critical('Нет переменной окружения %s', name)
+        return not missing
+
+
+def load_config():
+    """Читает .env, если он есть, и возвращает настройки."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Config.from_env()
@@ -0,0 +1,52 @@
+import json
+import logging
+
+from fileutils import write_json_atomic
+
+
+class CursorStore:
+    """Хранит from_date каждой подписки в JSON-файле на диске.
+
+    Без path курсоры живут только в памяти процесса.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._cursors = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Читает курсоры с диска, если файл уже есть."""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as cursors:
+                self._cursors = json.load(cursors)
+        except FileNotFoundError:
+            self._cursors = {}
+        except (OSError, json.JSONDecodeError) as error:
+            logging.error(
+                'Не удалось прочитать курсоры %s: %s', self.path, error)
+            self._cursors = {}
+
+    def get(self, key, default=None):
+        """Возвращает сохранённый from_date или default."""
+        return self._cursors.get(key, default)
+
+    def items(self):
+        """Пары (подписка, from_date)."""
+        return self._cursors.items()
+
+    def advance(self, key, from_date):
+        """Сдвигает курсор вперёд; назад он не откатывается."""
+        if from_date > self._cursors.get(key, 0):
+            self._cursors[key] = from_date
+            self._dirty = True
+
+    def flush(self):
+        """Атомарно записывает курсоры, если они менялись."""
+        if not self._dirty or self.path is None:
+            return
+        write_json_atomic(self.path, self._cursors)
+        self._dirty = False
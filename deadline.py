@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+# Сколько секунд ждём установки соединения.
+CONNECT_TIMEOUT = 5
+# Сколько секунд ждём очередной порции ответа.
+READ_TIMEOUT = 20
+# Бюджет одного опроса подписки целиком, в секундах.
+POLL_BUDGET = 30
+# Бюджет одной отправки сообщения в Телеграм, в секундах.
+SEND_BUDGET = 15
+
+
+class Deadline:
+    """Момент, к которому операция должна завершиться.
+
+    Таймауты вложенных вызовов берутся из остатка бюджета, поэтому
+    цепочка запросов не выходит за срок, отведённый всей операции.
+    """
+
+    def __init__(self, budget, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + budget
+
+    def remaining(self):
+        """Сколько секунд осталось до срока."""
+        return max(self.expires_at - self.clock(), 0)
+
+    def _remaining_or_raise(self):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise asyncio.TimeoutError('Бюджет времени операции исчерпан')
+        return remaining
+
+    def client_timeout(self, connect=CONNECT_TIMEOUT, read=READ_TIMEOUT):
+        """Таймауты aiohttp-запроса в пределах остатка бюджета."""
+        import aiohttp
+
+        remaining = self._remaining_or_raise()
+        return aiohttp.ClientTimeout(
+            total=remaining, connect=min(connect, remaining),
+            sock_read=min(read, remaining))
+
+    def requests_timeout(self, connect=CONNECT_TIMEOUT, read=READ_TIMEOUT):
+        """Пара (connect, read) для requests в пределах остатка бюджета."""
+        remaining = self._remaining_or_raise()
+        return min(connect, remaining), min(read, remaining)
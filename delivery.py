@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+from collections import deque
+
+from circuit_breaker import CircuitBreaker
+from exceptions import SendMessageError
+from homework import send_chat_message_async
+from rate_limit import TokenBucket
+
+# Ограничения Bot API: около 30 сообщений в секунду на бота
+# и не чаще сообщения в секунду в один чат.
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+CHAT_BURST = 3
+# Максимальная длина сообщения в Телеграме.
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+MAX_ATTEMPTS = 5
+BACKOFF = 1
+MAX_BACKOFF = 300
+# Как часто выбрасываем вёдра чатов, которым нечего отправлять, в секундах.
+SWEEP_INTERVAL = 600
+# Как часто заглядываем в outbox за новыми сообщениями, в секундах.
+OUTBOX_POLL = 1.0
+
+
+def coalesce(texts, limit=MESSAGE_LIMIT):
+    """Склеивает сообщения подряд, пока влезают в одно; возвращает остаток."""
+    message = texts[0][:limit]
+    taken = 1
+    for text in texts[1:]:
+        candidate = f'{message}{MESSAGE_SEPARATOR}{text}'
+        if len(candidate) > limit:
+            break
+        message = candidate
+        taken += 1
+    return message, texts[taken:]
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений в Телеграм.
+
+    Сообщения в один чат склеиваются, отправка идёт с учётом общего
+    и початового лимитов, а неудачные попытки повторяются с backoff
+    в фоне, не задерживая опрос API.
+
+    С outbox (SqliteStore) сообщения сначала записываются в базу
+    вместе с остальным состоянием опроса, очередь забирает их оттуда
+    и подтверждает только после удачной отправки. Неподтверждённые
+    сообщения после перезапуска отправляются снова, а отброшенные
+    после max_attempts попыток отмечаются в outbox и не повторяются.
+    """
+
+    def __init__(self, session, token, global_rate=GLOBAL_RATE,
+                 chat_rate=CHAT_RATE, chat_burst=CHAT_BURST,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF,
+                 max_backoff=MAX_BACKOFF, breaker=None, outbox=None,
+                 clock=time.monotonic):
+        self.session = session
+        self.token = token
+        self.outbox = outbox
+        self._loaded_id = 0
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.breaker = (
+            breaker if breaker is not None
+            else CircuitBreaker('telegram', clock=clock))
+        self._global = TokenBucket(global_rate, max(global_rate, 1), clock)
+        self._buckets = {}
+        self._pending = {}
+        self._attempts = {}
+        # Чат в _scheduled, пока он в _ready, в _deferred или в отправке.
+        self._scheduled = set()
+        self._ready = deque()
+        self._deferred = []
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self._swept_at = clock()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._pending.values())
+
+    def enqueue(self, chat_id, text, key=None):
+        """Ставит сообщение в очередь, не дожидаясь отправки.
+
+        key — ключ идемпотентности: в outbox сообщение с уже
+        известным ключом повторно не записывается.
+        """
+        if self.outbox is not None:
+            self.outbox.enqueue_message(chat_id, text, key)
+            return
+        self._push(chat_id, None, text)
+
+    def _push(self, chat_id, message_id, text):
+        self._pending.setdefault(chat_id, []).append((message_id, text))
+        if chat_id not in self._scheduled:
+            self._scheduled.add(chat_id)
+            self._ready.append(chat_id)
+        self._wakeup.set()
+
+    def _load_outbox(self):
+        """Забирает из outbox сообщения, появившиеся после прошлого раза."""
+        for message_id, chat_id, text in self.outbox.pending_messages(
+            after=self._loaded_id
+        ):
+            self._loaded_id = message_id
+            self._push(chat_id, message_id, text)
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(
+                self.chat_rate, self.chat_burst, self.clock)
+        return bucket
+
+    def _defer(self, chat_id, delay):
+        heapq.heappush(self._deferred, (self.clock() + delay, chat_id))
+
+    def _sweep(self):
+        now = self.clock()
+        if now - self._swept_at < SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        for chat_id in list(self._buckets):
+            if chat_id not in self._scheduled and self._buckets[chat_id].full:
+                del self._buckets[chat_id]
+
+    def flush_ready(self):
+        """Запускает все разрешённые лимитами отправки.
+
+        Возвращает паузу до момента, когда можно будет отправить ещё.
+        """
+        if self.outbox is not None:
+            self._load_outbox()
+        now = self.clock()
+        while self._deferred and self._deferred[0][0] <= now:
+            _, chat_id = heapq.heappop(self._deferred)
+            self._ready.append(chat_id)
+        while self._ready:
+            global_delay = self._global.delay()
+            if global_delay > 0:
+                return global_delay
+            chat_id = self._ready.popleft()
+            chat_delay = self._bucket(chat_id).delay()
+            if chat_delay > 0:
+                self._defer(chat_id, chat_delay)
+                continue
+            if not self.breaker.allow():
+                # Телеграм недоступен: копим сообщения до пробной отправки.
+                self._ready.appendleft(chat_id)
+                return self.breaker.retry_after()
+            self._global.try_acquire()
+            self._bucket(chat_id).try_acquire()
+            entries = self._pending.pop(chat_id)
+            message, rest = coalesce([text for _, text in entries])
+            taken = len(entries) - len(rest)
+            if rest:
+                self._pending[chat_id] = entries[taken:]
+            task = asyncio.create_task(
+                self._send(chat_id, message, entries[:taken]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._sweep()
+        if self._deferred:
+            return max(self._deferred[0][0] - now, 0)
+        return None
+
+    def _finish(self, chat_id):
+        if chat_id in self._pending:
+            self._ready.append(chat_id)
+        else:
+            self._scheduled.discard(chat_id)
+        self._wakeup.set()
+
+    async def _send(self, chat_id, message, entries):
+        try:
+            with self.breaker.track():
+                await send_chat_message_async(
+                    self.session, self.token, chat_id, message)
+        except SendMessageError:
+            attempt = self._attempts.get(chat_id, 0) + 1
+            if attempt >= self.max_attempts:
+                logging.error(
+                    'Сообщение в чат %s отброшено после %s попыток',
+                    chat_id, attempt)
+                if self.outbox is not None:
+                    # Иначе его повторно отправит только перезапуск.
+                    self.outbox.mark_failed(
+                        [message_id for message_id, _ in entries])
+                self._attempts.pop(chat_id, None)
+                self._finish(chat_id)
+                return
+            self._attempts[chat_id] = attempt
+            # Возвращаем сообщения в голову очереди чата и ждём с backoff.
+            self._pending[chat_id] = entries + self._pending.get(chat_id, [])
+            delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+            self._defer(chat_id, delay * random.uniform(0.5, 1.5))
+            self._wakeup.set()
+            return
+        if self.outbox is not None:
+            self.outbox.mark_delivered(
+                [message_id for message_id, _ in entries])
+        self._attempts.pop(chat_id, None)
+        self._finish(chat_id)
+
+    async def drain(self):
+        """Отправляет всё, что разрешено сейчас, и ждёт окончания отправок."""
+        self.flush_ready()
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+            self.flush_ready()
+
+    async def flush(self):
+        """Отправляет всю очередь с учётом лимитов, например при остановке."""
+        while True:
+            await self.drain()
+            if not self._pending:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.flush_ready())
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        """Фоновая отправка очереди."""
+        while True:
+            self._wakeup.clear()
+            delay = self.flush_ready()
+            if self.outbox is not None:
+                delay = min(delay or OUTBOX_POLL, OUTBOX_POLL)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
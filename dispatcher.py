@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+from homework import TELEGRAM_API
+from tenants import Tenant
+
+# Сколько секунд Телеграм держит запрос getUpdates, если обновлений нет.
+LONG_POLL_TIMEOUT = 30
+# Пауза перед повтором после сбоя getUpdates, в секундах.
+ERROR_DELAY = 5
+# Сколько подписок может оформить один чат. Каждый токен получает свою
+# долю общего лимита запросов к API, так что без предела один чат
+# вытеснил бы остальных.
+MAX_CHAT_SUBSCRIPTIONS = 5
+
+HELP = (
+    'Команды бота:\n'
+    '/start <токен Практикума> — подписаться на статусы работ\n'
+    '/status — последние известные статусы\n'
+    '/stop — отписаться'
+)
+
+
+class UpdateDispatcher:
+    """Принимает команды бота через getUpdates в том же цикле событий.
+
+    /status отвечает из состояния, которое уже держит движок опроса,
+    без лишних запросов к API Практикума.
+    """
+
+    def __init__(self, session, token, engine, registry,
+                 long_poll_timeout=LONG_POLL_TIMEOUT,
+                 max_subscriptions=MAX_CHAT_SUBSCRIPTIONS,
+                 sleep=asyncio.sleep):
+        self.session = session
+        self.token = token
+        self.engine = engine
+        self.registry = registry
+        self.long_poll_timeout = long_poll_timeout
+        self.max_subscriptions = max_subscriptions
+        self.sleep = sleep
+        self.offset = None
+        self.commands = {
+            '/start': self.start,
+            '/status': self.status,
+            '/stop': self.stop,
+        }
+
+    async def get_updates(self):
+        """Забирает новые обновления долгим опросом getUpdates."""
+        params = {
+            'timeout': self.long_poll_timeout,
+            'allowed_updates': json.dumps(['message']),
+        }
+        if self.offset is not None:
+            params['offset'] = self.offset
+        async with self.session.get(
+            TELEGRAM_API.format(token=self.token, method='getUpdates'),
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=self.long_poll_timeout + 10),
+        ) as response:
+            answer = await response.json(content_type=None)
+        if not answer.get('ok'):
+            raise ConnectionError(answer.get('description'))
+        return answer['result']
+
+    def handle(self, update):
+        """Разбирает одно обновление и ставит ответ в очередь доставки."""
+        message = update.get('message') or {}
+        text = message.get('text') or ''
+        chat_id = (message.get('chat') or {}).get('id')
+        if chat_id is None or not text.startswith('/'):
+            return
+        command, _, argument = text.partition(' ')
+        handler = self.commands.get(command.split('@')[0])
+        chat_id = str(chat_id)
+        reply = handler(chat_id, argument.strip()) if handler else HELP
+        self.engine.delivery.enqueue(chat_id, reply)
+
+    def start(self, chat_id, argument):
+        """Подписывает чат на статусы работ по токену."""
+        if not argument:
+            return HELP
+        tenant = Tenant(argument, chat_id)
+        if len(self.registry.for_chat(chat_id)) >= self.max_subscriptions:
+            return (f'Не больше {self.max_subscriptions} подписок на чат. '
+                    'Отпишитесь командой /stop и оформите нужные заново.')
+        if not self.registry.add(tenant):
+            return 'Вы уже подписаны на статусы работ с этим токеном.'
+        self.engine.add_tenant(tenant)
+        return 'Подписка оформлена, пришлю сообщение при смене статуса.'
+
+    def stop(self, chat_id, argument):
+        """Отписывает чат от всех его подписок."""
+        removed = self.registry.remove_chat(chat_id)
+        for tenant in removed:
+            self.engine.remove_tenant(tenant)
+        if not removed:
+            return 'Вы не подписаны.'
+        return 'Подписка отменена.'
+
+    def status(self, chat_id, argument):
+        """Последние известные статусы работ чата."""
+        tenants = self.registry.for_chat(chat_id)
+        if not tenants:
+            return 'Вы не подписаны. ' + HELP
+        lines = []
+        for tenant in tenants:
+            for name, status in sorted(
+                self.engine.homework_statuses(tenant).items()
+            ):
+                lines.append(f'"{name}": {status.verdict}')
+        return '\n'.join(lines) or 'Изменений статусов работ пока не было.'
+
+    async def run(self):
+        """Обрабатывает команды, пока процесс жив."""
+        while True:
+            try:
+                updates = await self.get_updates()
+            except Exception as error:
+                logging.error(
+                    'Не удалось получить обновления Telegram: %s', error)
+                await self.sleep(ERROR_DELAY)
+                continue
+            for update in updates:
+                self.offset = update['update_id'] + 1
+                try:
+                    self.handle(update)
+                except Exception as error:
+                    logging.error('Сбой при обработке команды: %s', error)
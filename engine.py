@@ -0,0 +1,474 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import signal
+import time
+from http import HTTPStatus
+
+from circuit_breaker import CircuitBreaker
+from cursors import CursorStore
+from delivery import GLOBAL_RATE, DeliveryQueue
+from deadline import POLL_BUDGET, Deadline
+from dispatcher import UpdateDispatcher
+from error_dedup import RECOVERY_MESSAGE, ErrorDeduplicator
+from exceptions import CircuitOpenError
+from homework import (RETRY_TIME, get_homework_statuses_async,
+                      parse_homework_statuses, parse_status)
+from hot_reload import TenantReloader
+from http_pool import ConnectionStats, create_session
+from log_pipeline import TENANT
+from metrics import (CONNECTIONS_CREATED, CONNECTIONS_REUSED, DELIVERY_QUEUE,
+                     RATE_LIMITED, TENANTS, monitor_loop_lag,
+                     start_metrics_server)
+from models import Homework
+from rate_limit import PRACTICUM_RATE, FairLimiter
+from response_cache import ResponseCache
+from scheduling import AdaptivePolicy, TenantState
+from singleflight import SingleFlight
+from state_cache import HomeworkStateCache
+from store import SqliteCursorStore
+
+# Сколько запросов к API и Телеграму держим в полёте одновременно.
+CONCURRENCY = 1000
+# Как часто планировщик просыпается проверить расписание, в секундах.
+MAX_TICK = 1.0
+# Как часто пишем в лог статистику пула соединений, в секундах.
+STATS_INTERVAL = 600
+# Как часто сбрасываем курсоры from_date на диск, в секундах.
+FLUSH_INTERVAL = 5
+# Сколько ждём начатые опросы и отправки при остановке, в секундах.
+SHUTDOWN_TIMEOUT = 30
+# Что получают подписчики токена, который API Практикума не принял.
+REJECTED_MESSAGE = (
+    'API Практикума не принимает токен, подписка снята. '
+    'Оформите её заново: /start <токен Практикума>.'
+)
+
+
+class Feed:
+    """Опрос одного токена Практикума: расписание, курсор и подписки.
+
+    Ментор и ученик с одним токеном получают один ответ API на двоих.
+    """
+
+    def __init__(self, tenant):
+        self.practicum_token = tenant.practicum_token
+        self.id = tenant.token_id
+        self.headers = tenant.headers
+        self.state = TenantState()
+        self.subscribers = {}
+
+
+class PollingEngine:
+    """Асинхронный планировщик опроса API по всем подпискам процесса.
+
+    Опрос идёт по токенам Практикума: у каждого токена одно расписание
+    и один курсор from_date, а ответ разбирается для всех его подписок.
+    """
+
+    def __init__(self, session, telegram_token, tenants,
+                 retry_time=RETRY_TIME, concurrency=CONCURRENCY,
+                 policy=None, cursors=None, states=None, delivery=None,
+                 breaker=None, errors=None, poll_budget=POLL_BUDGET,
+                 store=None, limiter=None, on_rejected=None, traffic=None,
+                 clock=time.time, sleep=asyncio.sleep):
+        self.session = session
+        self.telegram_token = telegram_token
+        self.retry_time = retry_time
+        self.poll_budget = poll_budget
+        self.store = store
+        self.limiter = limiter
+        # С on_rejected токен, на который API ответил 401, больше не
+        # опрашивается: его подписки снимаются и передаются on_rejected.
+        self.on_rejected = on_rejected
+        # Журнал трафика (TrafficLog): в него пишется каждая подписка,
+        # и та, что оформлена на ходу, чтобы replay её воспроизвёл.
+        self.traffic = traffic
+        self.clock = clock
+        self.sleep = sleep
+        self.policy = (
+            policy if policy is not None else AdaptivePolicy(retry_time))
+        self.delivery = (
+            delivery if delivery is not None
+            else DeliveryQueue(
+                session, telegram_token, outbox=store, clock=clock))
+        self.cursors = cursors if cursors is not None else CursorStore()
+        self.errors = (
+            errors if errors is not None else ErrorDeduplicator(clock=clock))
+        self.breaker = (
+            breaker if breaker is not None
+            else CircuitBreaker('practicum', clock=clock))
+        self.states = (
+            states if states is not None else HomeworkStateCache(clock=clock))
+        self._flushed_at = clock()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queue = []
+        self._counter = itertools.count()
+        self._tasks = set()
+        self._feeds = {}
+        self._subscriptions = {}
+        self._flights = SingleFlight()
+        self.responses = ResponseCache()
+        self.stopping = False
+        # Сроки опросов из прошлого запуска: читаются одним запросом и
+        # используются при первой постановке токена в расписание.
+        self._saved_schedule = store.schedules() if store is not None else {}
+        tenants = list(tenants)
+        for number, tenant in enumerate(tenants):
+            # Разносим первые опросы по интервалу, чтобы не бить API пачкой.
+            self.add_tenant(tenant, delay=retry_time * number / len(tenants))
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def add_tenant(self, tenant, delay=0):
+        """Ставит подписку в расписание опроса; False, если она уже там."""
+        if tenant.key in self._subscriptions:
+            return False
+        feed = self._feeds.get(tenant.practicum_token)
+        if feed is None:
+            feed = self._feeds[tenant.practicum_token] = Feed(tenant)
+            self._schedule_feed(feed, delay)
+        else:
+            # Новая подписка должна разобрать следующий ответ токена,
+            # даже если он не изменился.
+            feed.state.fingerprint = None
+        feed.subscribers[tenant.key] = tenant
+        self._subscriptions[tenant.key] = feed
+        if self.traffic is not None:
+            self.traffic.tenant(tenant)
+        return True
+
+    def _schedule_feed(self, feed, delay):
+        now = self.clock()
+        # Новый токен начинает с текущего момента, без старой истории.
+        if self.cursors.get(feed.id) is None:
+            self.cursors.advance(feed.id, int(now))
+        due = now + delay
+        # После перезапуска продолжаем прежнее расписание. Просроченные
+        # за время простоя опросы не сходятся в один момент, а остаются
+        # разнесёнными по интервалу.
+        next_poll_at = self._saved_schedule.pop(feed.id, None)
+        if next_poll_at is not None:
+            due = max(due, next_poll_at)
+        heapq.heappush(self._queue, (due, next(self._counter), feed))
+
+    def remove_tenant(self, tenant):
+        """Снимает подписку с опроса и забывает её состояние."""
+        feed = self._subscriptions.pop(tenant.key, None)
+        if feed is not None:
+            del feed.subscribers[tenant.key]
+            feed.state.reviewing = {
+                key for key in feed.state.reviewing if key[0] != tenant.key}
+            if not feed.subscribers:
+                # Последняя подписка токена: его опрос снимается.
+                del self._feeds[feed.practicum_token]
+        self.errors.forget(tenant)
+        self.states.forget(tenant.key)
+
+    def homework_statuses(self, tenant):
+        """Известные статусы работ подписки: {название: статус}."""
+        return self.states.statuses(tenant.key)
+
+    async def notify(self, tenant, message, key=None):
+        """Ставит сообщение подписчику в очередь доставки."""
+        self.delivery.enqueue(tenant.chat_id, message, key=key)
+        return True
+
+    async def notify_transitions(self, tenant, homeworks, from_date=None):
+        """Сообщает только о работах, у которых сменился статус.
+
+        Возвращает список пар (работа, новый статус). Ключ
+        идемпотентности сообщения — переход статуса при данном курсоре
+        from_date: если процесс упал до сохранения курсора, повторный
+        опрос найдёт тот же переход, и outbox не запишет его дважды.
+        """
+        transitions = []
+        for homework in homeworks:
+            if not isinstance(homework, Homework):
+                homework = Homework.from_api(homework)
+            key = (tenant.key, homework.id)
+            previous = self.states.get(key)
+            if previous is not None and previous.status == homework.status:
+                continue
+            idempotency_key = ':'.join(map(str, (
+                tenant.id, homework.id,
+                previous.status.api_name if previous else '',
+                homework.status.api_name, from_date)))
+            await self.notify(
+                tenant, parse_status(homework), key=idempotency_key)
+            self.states.remember(key, homework)
+            transitions.append((key, homework.status))
+        return transitions
+
+    async def fetch(self, feed, from_date):
+        """Запрос к API; одинаковые одновременные запросы идут одним.
+
+        feed — опрос токена или подписка: нужны токен и заголовки.
+        """
+        return await self._flights.do(
+            (feed.practicum_token, from_date),
+            lambda: self.breaker.call(
+                lambda: self._request(feed, from_date)))
+
+    async def _request(self, feed, from_date):
+        if self.limiter is not None:
+            await self.limiter.acquire(feed.practicum_token)
+        # Срок на весь опрос отсчитываем с момента, когда лимитер пустил
+        # запрос: ожидание в очереди не съедает таймауты.
+        deadline = Deadline(self.poll_budget)
+        token = feed.practicum_token
+        status, headers, body = await get_homework_statuses_async(
+            self.session, feed.headers, from_date, deadline=deadline,
+            conditional=self.responses.conditional_headers(token, from_date))
+        return await self.responses.resolve(
+            token, from_date, status, headers, body, parse_homework_statuses)
+
+    async def poll(self, feed):
+        """Один опрос API по токену; ответ разбирается для всех подписок."""
+        if self._feeds.get(feed.practicum_token) is not feed:
+            return
+        state = feed.state
+        # Каждый опрос идёт своей задачей, поэтому контекст не протекает.
+        TENANT.set(feed.id)
+        from_date = self.cursors.get(feed.id)
+        try:
+            response = await self.fetch(feed, from_date)
+            transitions = await self._diff_and_notify(
+                feed, response, from_date)
+            if isinstance(response.current_date, int):
+                self.cursors.advance(feed.id, response.current_date)
+            state.record_success(transitions)
+            for tenant in list(feed.subscribers.values()):
+                if self.errors.record_success(tenant):
+                    await self.notify(tenant, RECOVERY_MESSAGE)
+        except CircuitOpenError as error:
+            # Сбой общий для всех: не пишем подписчикам и не растим backoff.
+            logging.debug(str(error))
+        except Exception as error:
+            state.record_error()
+            if (self.on_rejected is not None
+                    and getattr(error, 'status', None)
+                    == HTTPStatus.UNAUTHORIZED):
+                await self._reject(feed)
+            else:
+                await self._notify_failure(feed, error)
+
+    async def _diff_and_notify(self, feed, response, from_date):
+        """Разбирает ответ токена для каждой подписки; возвращает переходы."""
+        # Подписки уже разобрали такой же ответ: сравнивать нечего.
+        if response.fingerprint == feed.state.fingerprint:
+            return []
+        transitions = []
+        for tenant in list(feed.subscribers.values()):
+            transitions += await self.notify_transitions(
+                tenant, response.homeworks, from_date)
+        feed.state.fingerprint = response.fingerprint
+        return transitions
+
+    async def _notify_failure(self, feed, error):
+        """Пишет сбой в лог и сообщает о нём подписчикам без повторов."""
+        message = f'Сбой в работе программы: {error}'
+        logging.error(message)
+        for tenant in list(feed.subscribers.values()):
+            if self.errors.record_failure(tenant, error):
+                await self.notify(tenant, message)
+
+    async def _reject(self, feed):
+        """Снимает с опроса токен, который API не принял."""
+        logging.warning('API не принял токен, подписок снято: %s',
+                        len(feed.subscribers))
+        for tenant in list(feed.subscribers.values()):
+            self.remove_tenant(tenant)
+            self.on_rejected(tenant)
+            await self.notify(tenant, REJECTED_MESSAGE)
+
+    async def _poll_and_reschedule(self, feed, due):
+        async with self._semaphore:
+            await self.poll(feed)
+        if self._feeds.get(feed.practicum_token) is not feed:
+            return
+        due = max(due, self.clock()) + self.policy.next_delay(feed.state)
+        if self.store is not None:
+            self.store.schedule(feed.id, due)
+        heapq.heappush(self._queue, (due, next(self._counter), feed))
+
+    def next_poll_at(self):
+        """Срок ближайшего опроса по расписанию или None."""
+        return self._queue[0][0] if self._queue else None
+
+    def run_pending(self):
+        """Запускает опросы, чей срок наступил.
+
+        Возвращает паузу до следующего опроса.
+        """
+        now = self.clock()
+        while self._queue and self._queue[0][0] <= now:
+            due, _, feed = heapq.heappop(self._queue)
+            # Подписки токена сняли или добавили заново: запись устарела.
+            if self._feeds.get(feed.practicum_token) is not feed:
+                continue
+            task = asyncio.create_task(
+                self._poll_and_reschedule(feed, due))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if not self._queue:
+            return MAX_TICK
+        return min(self._queue[0][0] - now, MAX_TICK)
+
+    def checkpoint(self, force=False):
+        """Сбрасывает курсоры и сбои на диск не чаще раза в FLUSH_INTERVAL.
+
+        Записи в store уходят одной транзакцией на каждом такте.
+        """
+        if self.store is not None:
+            self.store.commit()
+        now = self.clock()
+        if force or now - self._flushed_at >= FLUSH_INTERVAL:
+            self.cursors.flush()
+            self.errors.flush()
+            self._flushed_at = now
+
+    async def drain(self):
+        """Дожидается завершения опросов и отправки готовых сообщений."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+        # С outbox сообщения видны очереди доставки только после commit.
+        self.checkpoint()
+        await self.delivery.drain()
+
+    async def run_forever(self):
+        """Крутит расписание опросов до вызова stop()."""
+        while not self.stopping:
+            delay = self.run_pending()
+            self.checkpoint()
+            await self.sleep(delay)
+
+    def stop(self):
+        """Перестаёт запускать новые опросы; начатые доводит shutdown()."""
+        if not self.stopping:
+            logging.info('Останавливаемся: доводим начатые опросы и отправки')
+        self.stopping = True
+
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Дожидается начатых опросов и очереди отправки, сохраняет курсоры.
+
+        Что не успело уйти за timeout, остаётся в outbox, если он есть.
+        """
+        async def finish():
+            while self._tasks:
+                await asyncio.gather(*self._tasks)
+            self.checkpoint()
+            await self.delivery.flush()
+
+        try:
+            await asyncio.wait_for(finish(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                'Остановка: не отправлено сообщений: %s', len(self.delivery))
+        self.checkpoint(force=True)
+
+
+async def log_connection_stats(stats, interval=STATS_INTERVAL):
+    """Периодически пишет в лог статистику переиспользования соединений."""
+    while True:
+        await asyncio.sleep(interval)
+        logging.info('Пул HTTP-соединений: %s', stats)
+
+
+def register_gauges(engine, stats):
+    """Связывает метрики-датчики с состоянием движка и пула."""
+    DELIVERY_QUEUE.set_function(lambda: len(engine.delivery))
+    TENANTS.set_function(lambda: len(engine))
+    if engine.limiter is not None:
+        RATE_LIMITED.set_function(lambda: len(engine.limiter))
+    CONNECTIONS_CREATED.set_function(lambda: stats.created)
+    CONNECTIONS_REUSED.set_function(lambda: stats.reused)
+
+
+async def serve(telegram_token, registry, pool_options=None,
+                cursors_file=None, dispatch=False, metrics_port=None,
+                background=(), errors_file=None, store=None,
+                record_file=None, tenants_file=None,
+                practicum_rate=PRACTICUM_RATE, telegram_rate=GLOBAL_RATE):
+    """Поднимает пул соединений и запускает опрос всех подписок.
+
+    С dispatch=True тот же процесс принимает команды бота, а токены,
+    которые API не принял, снимаются с опроса и из реестра;
+    с metrics_port отдаёт метрики на http://127.0.0.1:<port>/metrics.
+    background — фабрики корутин, которые получают движок и работают
+    рядом с ним до остановки. Со store (SqliteStore) курсоры, статусы
+    работ и расписание опроса хранятся в SQLite вместо cursors_file.
+    С record_file трафик к API пишется в журнал для replay.
+    practicum_rate и telegram_rate — лимиты запросов этого процесса
+    к API Практикума и Bot API, в запросах в секунду.
+
+    SIGTERM и SIGINT останавливают опрос: начатые опросы и отправки
+    доводятся, курсоры сохраняются. С tenants_file правки файла
+    подписок применяются на ходу — по SIGHUP или при смене файла.
+    """
+    stats = ConnectionStats()
+    async with create_session(stats, **(pool_options or {})) as session:
+        traffic = None
+        if record_file:
+            from replay import RecordingSession, TrafficLog
+
+            traffic = TrafficLog(record_file)
+            session = RecordingSession(session, traffic)
+        if store is not None:
+            storage = {
+                'cursors': SqliteCursorStore(store),
+                'states': HomeworkStateCache(store=store),
+                'store': store,
+            }
+        else:
+            storage = {'cursors': CursorStore(cursors_file)}
+        # Ведро общего лимита вмещает секунду запросов, но не меньше одного.
+        limiter = FairLimiter(practicum_rate, burst=max(practicum_rate, 1))
+        delivery = DeliveryQueue(
+            session, telegram_token, global_rate=telegram_rate, outbox=store)
+        engine = PollingEngine(
+            session, telegram_token, registry,
+            errors=ErrorDeduplicator(errors_file), limiter=limiter,
+            delivery=delivery, traffic=traffic,
+            on_rejected=registry.remove if dispatch else None, **storage)
+        register_gauges(engine, stats)
+        tasks = [
+            asyncio.create_task(log_connection_stats(stats)),
+            asyncio.create_task(engine.delivery.run()),
+            asyncio.create_task(monitor_loop_lag()),
+        ]
+        metrics_runner = None
+        if metrics_port:
+            metrics_runner = await start_metrics_server(metrics_port)
+        if dispatch:
+            dispatcher = UpdateDispatcher(
+                session, telegram_token, engine, registry)
+            tasks.append(asyncio.create_task(dispatcher.run()))
+        for factory in background:
+            tasks.append(asyncio.create_task(factory(engine)))
+        loop = asyncio.get_running_loop()
+        handled = [signal.SIGTERM, signal.SIGINT]
+        for signum in handled:
+            loop.add_signal_handler(signum, engine.stop)
+        if tenants_file:
+            reloader = TenantReloader(tenants_file, registry, engine)
+            loop.add_signal_handler(signal.SIGHUP, reloader.reload)
+            handled.append(signal.SIGHUP)
+            tasks.append(asyncio.create_task(reloader.watch()))
+        try:
+            await engine.run_forever()
+        finally:
+            for signum in handled:
+                loop.remove_signal_handler(signum)
+            for task in tasks:
+                task.cancel()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            await engine.shutdown()
+            if store is not None:
+                store.close()
+            if traffic is not None:
+                traffic.close()
+            logging.info('Пул HTTP-соединений: %s', stats)
@@ -0,0 +1,120 @@
+import json
+import logging
+import re
+import time
+
+from fileutils import write_json_atomic
+
+# Как часто напоминаем чату о сбое, который всё ещё не прошёл, в секундах.
+WINDOW = 60 * 60
+RECOVERY_MESSAGE = 'Сбой устранён, статусы работ снова приходят.'
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и текст без чисел.
+
+    Одинаковые сбои с разными временными метками, портами и кодами
+    запросов дают один отпечаток.
+    """
+    return f'{type(error).__name__}:{re.sub(r"[0-9]+", "#", str(error))}'
+
+
+class ErrorDeduplicator:
+    """Решает, писать ли подписчику о сбое, и помнит это между запусками.
+
+    Один и тот же сбой сообщается чату не чаще раза в окно, сколько бы
+    подписок чата на нём ни падало. Когда все подписки чата с этим
+    сбоем снова опрашиваются успешно, чат получает сообщение
+    о восстановлении.
+    """
+
+    def __init__(self, path=None, window=WINDOW, clock=time.time):
+        self.path = path
+        self.window = window
+        self.clock = clock
+        # id подписки -> [чат, отпечаток текущего сбоя].
+        self._failing = {}
+        # чат -> {отпечаток: когда последний раз сообщили}.
+        self._notified = {}
+        # (чат, отпечаток) -> сколько подписок чата падает с этим сбоем.
+        self._counts = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Читает состояние с диска, если файл уже есть."""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as errors:
+                state = json.load(errors)
+            failing, notified = state['failing'], state['notified']
+        except FileNotFoundError:
+            return
+        except (OSError, KeyError, TypeError, json.JSONDecodeError) as error:
+            logging.error(
+                'Не удалось прочитать состояние ошибок %s: %s',
+                self.path, error)
+            return
+        self._failing = failing
+        self._notified = notified
+        for failure in failing.values():
+            self._count(failure, 1)
+
+    def _count(self, failure, delta):
+        key = tuple(failure)
+        count = self._counts.get(key, 0) + delta
+        if count > 0:
+            self._counts[key] = count
+        else:
+            self._counts.pop(key, None)
+        return count
+
+    def _clear(self, tenant):
+        """Снимает сбой подписки; True, если сбой чата прошёл целиком."""
+        failure = self._failing.pop(tenant.id, None)
+        if failure is None:
+            return False
+        self._dirty = True
+        if self._count(failure, -1):
+            return False
+        chat_id, key = failure
+        notified = self._notified.get(chat_id, {})
+        reported = notified.pop(key, None) is not None
+        if not notified:
+            self._notified.pop(chat_id, None)
+        return reported
+
+    def record_failure(self, tenant, error):
+        """Учитывает сбой опроса; True, если чату нужно о нём написать."""
+        chat_id = str(tenant.chat_id)
+        key = fingerprint(error)
+        failure = [chat_id, key]
+        if self._failing.get(tenant.id) != failure:
+            self._clear(tenant)
+            self._failing[tenant.id] = failure
+            self._count(failure, 1)
+            self._dirty = True
+        notified = self._notified.setdefault(chat_id, {})
+        now = self.clock()
+        if now - notified.get(key, float('-inf')) < self.window:
+            return False
+        notified[key] = now
+        self._dirty = True
+        return True
+
+    def record_success(self, tenant):
+        """Учитывает удачный опрос; True — пора сообщить о восстановлении."""
+        return self._clear(tenant)
+
+    def forget(self, tenant):
+        """Забывает сбой снятой подписки без сообщения о восстановлении."""
+        self._clear(tenant)
+
+    def flush(self):
+        """Атомарно записывает состояние, если оно менялось."""
+        if not self._dirty or self.path is None:
+            return
+        write_json_atomic(
+            self.path, {'failing': self._failing, 'notified': self._notified})
+        self._dirty = False
@@ -1,6 +1,22 @@
 class NotStatusOkException(Exception):
     """Исключение статуса ответа."""
 
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
 
 class SendMessageError(Exception):
     """Ошибка отправки сообщения в телеграмм."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TenantConfigError(Exception):
+    """Ошибка в реестре подписок."""
+
+
+class CircuitOpenError(Exception):
+    """Вызов не выполнен: предохранитель внешнего сервиса разомкнут."""
@@ -0,0 +1,19 @@
+import json
+import os
+import tempfile
+
+
+def write_json_atomic(path, data):
+    """Записывает JSON так, что читатель видит либо старый файл, либо новый."""
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f'.{os.path.basename(path)}-', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -1,58 +1,120 @@
+import asyncio
 import json
+import logging
 import os
-import time
-import requests
 import sys
-
-import telegram
-import logging
-from dotenv import load_dotenv
+import time
 from http import HTTPStatus
 
+from deadline import POLL_BUDGET, SEND_BUDGET, Deadline
 from exceptions import NotStatusOkException, SendMessageError
+from metrics import (PRACTICUM_LATENCY, PRACTICUM_REQUESTS, TELEGRAM_LATENCY,
+                     TELEGRAM_MESSAGES, UPSTREAM_TIMEOUTS, VALIDATION_FAILURES,
+                     count_failures)
+from models import HOMEWORK_VERDICTS, Homework  # noqa: F401
+from streaming import HomeworkStreamParser
 
-load_dotenv()
-
-
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Токены одного ученика для синхронного API модуля: PRACTICUM_TOKEN,
+# TELEGRAM_TOKEN и TELEGRAM_CHAT_ID. Они берутся из config.Config
+# вместе с .env при первом обращении, см. __getattr__. Воркер читает
+# настройки сам, один раз в main().
+TOKEN_SETTINGS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
 RETRY_TIME = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.',
-}
+TELEGRAM_API = 'https://api.telegram.org/bot{token}/{method}'
+# Кусками какого размера разбираем уже прочитанное тело ответа API.
+BODY_CHUNK = 64 * 1024
+
+
+def __getattr__(name):
+    """Читает токены ученика из настроек при первом обращении к ним."""
+    if name not in TOKEN_SETTINGS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from config import load_config
+
+    config = load_config()
+    for setting in TOKEN_SETTINGS:
+        # Значение, уже присвоенное модулю, не перетираем.
+        globals().setdefault(setting, getattr(config, setting.lower()))
+    return globals()[name]
+
+
+def _setting(name):
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
 def send_message(bot, message):
     """Отправляет сообщение в Телеграм."""
+    send_chat_message(bot, _setting('TELEGRAM_CHAT_ID'), message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """Отправляет сообщение в указанный чат Телеграма."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logging.info(
-            f'Сообщение в Telegram отправлено: {message}')
+        bot.send_message(chat_id, message, timeout=SEND_BUDGET)
+        logging.info('Сообщение в Telegram отправлено: %s', message)
     except Exception as error:
-        logging.error(
-            f'Сообщение в Telegram не отправлено: {error}')
+        logging.error('Сообщение в Telegram не отправлено: %s', error)
         raise SendMessageError('Сообщение не в телеграмм не отправилось')
 
 
+async def send_chat_message_async(session, token, chat_id, message,
+                                  deadline=None):
+    """Отправляет сообщение в чат через Bot API, не блокируя цикл событий."""
+    url = TELEGRAM_API.format(token=token, method='sendMessage')
+    started = time.perf_counter()
+    status = None
+    try:
+        timeout = (deadline or Deadline(SEND_BUDGET)).client_timeout()
+        async with session.post(
+            url, json={'chat_id': chat_id, 'text': message}, timeout=timeout,
+        ) as response:
+            status = response.status
+            answer = await response.json(content_type=None)
+        if not answer.get('ok'):
+            status = answer.get('error_code', status)
+            raise SendMessageError(answer.get('description'))
+        TELEGRAM_MESSAGES.labels('ok').inc()
+        logging.info('Сообщение в Telegram отправлено: %s', message)
+    except Exception as error:
+        if isinstance(error, asyncio.TimeoutError):
+            UPSTREAM_TIMEOUTS.labels('telegram').inc()
+        TELEGRAM_MESSAGES.labels('error').inc()
+        logging.error('Сообщение в Telegram не отправлено: %s', error)
+        raise SendMessageError(
+            'Сообщение не в телеграмм не отправилось', status=status)
+    finally:
+        TELEGRAM_LATENCY.observe(time.perf_counter() - started)
+
+
 def get_api_answer(current_timestamp):
     """Направляет запрос к API ЯндексПрактикума,возращает ответ."""
-    params = {'from_date': current_timestamp}
+    token = _setting('PRACTICUM_TOKEN')
+    return get_homework_statuses(
+        {'Authorization': f'OAuth {token}'}, current_timestamp)
+
+
+def get_homework_statuses(headers, from_date, deadline=None):
+    """Запрашивает статусы работ от имени ученика с заданными заголовками."""
+    import requests
+
+    params = {'from_date': from_date}
     try:
         logging.info('Отправляю запрос к API ЯндексПрактикума')
         response = requests.get(
             ENDPOINT,
-            headers=HEADERS,
+            headers=headers,
             params=params,
+            timeout=(deadline or Deadline(POLL_BUDGET)).requests_timeout(),
         )
         if response.status_code != HTTPStatus.OK:
             logging.error('Недоступность эндпоинта')
             raise NotStatusOkException('Недоступность эндпоинта')
         return response.json()
+    except (requests.exceptions.Timeout, TimeoutError):
+        UPSTREAM_TIMEOUTS.labels('practicum').inc()
+        logging.error('Превышено время ожидания ответа эндпоинта')
+        raise TimeoutError('Превышено время ожидания ответа эндпоинта')
     except ConnectionError:
         logging.error('Сбой при запросе к эндпоинту')
         raise ConnectionError('Сбой при запросе к эндпоинту')
@@ -61,6 +123,53 @@ def get_api_answer(current_timestamp):
         raise json.JSONDecodeError('Ошибка при преобразовании')
 
 
+async def get_homework_statuses_async(session, headers, from_date,
+                                      deadline=None, conditional=None):
+    """Асинхронный вариант get_homework_statuses поверх aiohttp.
+
+    Ответ не разбирается: функция возвращает (статус, заголовки, тело),
+    а тело разбирает parse_homework_statuses. С conditional —
+    заголовками условного запроса — принимается и 304.
+    """
+    import aiohttp
+
+    params = {'from_date': from_date}
+    if conditional is not None:
+        headers = {**headers, **conditional}
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        logging.info('Отправляю запрос к API ЯндексПрактикума')
+        async with session.get(
+            ENDPOINT,
+            headers=headers,
+            params=params,
+            timeout=(deadline or Deadline(POLL_BUDGET)).client_timeout(),
+        ) as response:
+            outcome = str(response.status)
+            if (conditional is not None
+                    and response.status == HTTPStatus.NOT_MODIFIED):
+                return response.status, response.headers, b''
+            if response.status != HTTPStatus.OK:
+                logging.error('Недоступность эндпоинта')
+                raise NotStatusOkException(
+                    'Недоступность эндпоинта', status=response.status)
+            return response.status, response.headers, await response.read()
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+        UPSTREAM_TIMEOUTS.labels('practicum').inc()
+        logging.error('Превышено время ожидания ответа эндпоинта')
+        raise
+    except aiohttp.ClientError as error:
+        outcome = type(error).__name__
+        logging.error('Сбой при запросе к эндпоинту')
+        raise ConnectionError('Сбой при запросе к эндпоинту') from error
+    finally:
+        PRACTICUM_REQUESTS.labels(outcome).inc()
+        PRACTICUM_LATENCY.observe(time.perf_counter() - started)
+
+
+@count_failures('check_response')
 def check_response(response):
     """Возвращает содержимое в ответе от ЯндексПрактикума."""
     if not isinstance(response, dict):
@@ -76,65 +185,119 @@ def check_response(response):
     return homework
 
 
+async def read_homework_statuses(chunks):
+    """Потоково разбирает тело ответа API в компактный словарь.
+
+    Каждая работа сразу сжимается в запись Homework, так что память
+    не зависит от размера полей, которые бот не использует.
+    """
+    parser = HomeworkStreamParser(chunks)
+    homeworks = []
+    try:
+        async for homework in parser.homeworks():
+            homeworks.append(Homework.from_api(homework))
+    except TypeError:
+        VALIDATION_FAILURES.labels('check_response').inc()
+        raise
+    except KeyError:
+        VALIDATION_FAILURES.labels('parse_status').inc()
+        raise
+    return {'homeworks': homeworks, 'current_date': parser.current_date}
+
+
+async def parse_homework_statuses(body, chunk_size=BODY_CHUNK):
+    """Разбирает прочитанное тело ответа так же, как read_homework_statuses.
+
+    Тело отдаётся парсеру кусками, поэтому рядом с ним в памяти не
+    появляется ни полный словарь ответа, ни вся его строка.
+    """
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    return await read_homework_statuses(chunks())
+
+
+@count_failures('parse_status')
 def parse_status(homework):
     """Извлекает статус работы из ответа ЯндексПракутикум."""
-    if 'homework_name' not in homework:
-        logging.error('В ответе API нет ключа homework_name')
-        raise KeyError('В ответе API нет ключа homework_name')
-    homework_name = homework.get('homework_name')
-    if 'status' not in homework:
-        logging.error('В ответе API нет ключа homework_status')
-        raise KeyError('В ответе API нет ключа homework_status')
-    homework_status = homework.get('status')
-    verdict = HOMEWORK_VERDICTS.get(homework_status)
-    if verdict is None:
-        logging.error('Неизвестный статус')
-        raise KeyError('Неизвестный статус')
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    if not isinstance(homework, Homework):
+        homework = Homework.from_api(homework)
+    return homework.message
 
 
 def check_tokens():
     """Проверяет наличие токенов."""
-    return all([PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID])
+    return all([_setting(name) for name in TOKEN_SETTINGS])
+
+
+def configure_logging(config=None):
+    """Настраивает вывод логов в stdout.
+
+    Без config — обычный текстовый лог; с config формат, очередь и
+    прореживание берутся из LOG_JSON, LOG_ASYNC и LOG_SAMPLE.
+    """
+    from log_pipeline import setup_logging
+
+    if config is None:
+        return setup_logging()
+    return setup_logging(
+        json_format=config.log_json, use_queue=config.log_async,
+        sample=config.log_sample)
 
 
 def main():
-    """Основная логика работы бота."""
-    error_memory = ''
-    logging.basicConfig(
-        level=logging.INFO,
-        format=(
-            '%(asctime)s - [%(levelname)s][%(lineno)s][%(filename)s]'
-            '[%(funcName)s]- %(message)s'
-        ),
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    if not check_tokens():
-        exit()
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homework = check_response(response)
-            message = parse_status(homework)
-            send_message(bot, message)
-            logging.info(
-                'Изменений нет, ждем 10 минут и проверяем API')
-            time.current_timestamp(RETRY_TIME)
-        except SendMessageError:
-            raise SendMessageError(
-                'Ошибка отправки сообщения в телеграмм.'
-            )
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            if str(error) != str(error_memory):
-                error_memory = error
-                send_message(bot, message)
-        finally:
-            time.sleep(RETRY_TIME)
+    """Основная логика работы бота; возвращает код завершения процесса."""
+    from config import load_config
+    from engine import serve
+    from tenants import Tenant, TenantRegistry
+
+    config = load_config()
+    configure_logging(config)
+    if config.tenants_file:
+        if not config.telegram_token:
+            logging.critical('Нет переменной окружения TELEGRAM_TOKEN')
+            return 1
+        if config.shards > 1:
+            from sharding import supervise
+            # Шарды хранят курсоры в своих файлах: общей базы и журнала
+            # трафика у них нет, и молча терять их нельзя.
+            for name, value in (('STORE_FILE', config.store_file),
+                                ('RECORD_FILE', config.record_file)):
+                if value:
+                    logging.critical(
+                        '%s не поддерживается вместе с SHARDS', name)
+                    return 1
+            supervise(config)
+            return 0
+        registry = TenantRegistry.load(config.tenants_file)
+    else:
+        if not config.check_tokens():
+            return 1
+        registry = TenantRegistry(
+            [Tenant(config.practicum_token, config.telegram_chat_id)])
+    store = None
+    if config.store_file:
+        from store import SqliteStore, SqliteTenantRegistry
+        store = SqliteStore(config.store_file)
+        if config.tenants_file and not os.path.exists(config.tenants_file):
+            # Файла нет: сверять не с чем, подписки базы не трогаем.
+            registry = SqliteTenantRegistry(store)
+        else:
+            synced = SqliteTenantRegistry.sync(store, list(registry))
+            if config.tenants_file:
+                registry = synced
+    asyncio.run(serve(
+        config.telegram_token, registry, config.pool_options,
+        config.cursors_file, dispatch=bool(config.tenants_file),
+        metrics_port=config.metrics_port, errors_file=config.errors_file,
+        store=store, record_file=config.record_file,
+        tenants_file=config.tenants_file,
+        practicum_rate=config.practicum_rate,
+        telegram_rate=config.telegram_rate,
+    ))
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
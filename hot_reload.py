@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import os
+
+from exceptions import TenantConfigError
+from tenants import load_tenants
+
+# Как часто проверяем, не изменился ли файл подписок, в секундах.
+WATCH_INTERVAL = 5
+
+
+def spread(engine, tenants):
+    """Ставит подписки в расписание вразброс по интервалу опроса."""
+    tenants = list(tenants)
+    for number, tenant in enumerate(tenants):
+        engine.add_tenant(
+            tenant, delay=engine.retry_time * number / len(tenants))
+
+
+class TenantReloader:
+    """Переносит в движок правки файла подписок без перезапуска.
+
+    Новый файл сравнивается с прочитанным в прошлый раз: добавленные
+    подписки встают в расписание вразброс, удалённые снимаются, а
+    остальные продолжают опрос по своему расписанию. Подписки,
+    добавленные командами бота, правки файла не затрагивают.
+    """
+
+    def __init__(self, path, registry, engine):
+        self.path = path
+        self.registry = registry
+        self.engine = engine
+        self._mtime = self._stat()
+        try:
+            self._known = self._read()
+        except TenantConfigError:
+            self._known = {}
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self):
+        return {tenant.key: tenant for tenant in load_tenants(self.path)}
+
+    def reload(self):
+        """Перечитывает файл и применяет разницу: (новые, снятые)."""
+        self._mtime = self._stat()
+        try:
+            tenants = self._read()
+        except TenantConfigError as error:
+            logging.error('Реестр подписок не перечитан: %s', error)
+            return [], []
+        added = [tenant for key, tenant in tenants.items()
+                 if key not in self._known]
+        removed = [tenant for key, tenant in self._known.items()
+                   if key not in tenants]
+        self._known = tenants
+        self.registry.apply(added, removed)
+        for tenant in removed:
+            self.engine.remove_tenant(tenant)
+        spread(self.engine, added)
+        logging.info('Реестр подписок перечитан: добавлено %s, снято %s',
+                     len(added), len(removed))
+        return added, removed
+
+    async def watch(self, interval=WATCH_INTERVAL):
+        """Перечитывает файл, когда у него меняется время изменения."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._stat() != self._mtime:
+                self.reload()
@@ -0,0 +1,63 @@
+from deadline import CONNECT_TIMEOUT, POLL_BUDGET, READ_TIMEOUT
+
+# Общий размер пула соединений процесса.
+POOL_SIZE = 100
+# Сколько соединений держим к одному хосту (API Практикума, Bot API).
+POOL_PER_HOST = 50
+# Через сколько секунд простоя закрываем keep-alive соединение.
+KEEPALIVE_TIMEOUT = 60
+
+
+class ConnectionStats:
+    """Счётчики новых и переиспользованных соединений пула."""
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def reuse_ratio(self):
+        """Доля запросов, обслуженных уже открытым соединением."""
+        total = self.created + self.reused
+        return self.reused / total if total else 0.0
+
+    def __str__(self):
+        return (
+            f'новых соединений: {self.created}, '
+            f'переиспользовано: {self.reused} '
+            f'({self.reuse_ratio:.0%})'
+        )
+
+    def trace_config(self):
+        """Трассировка aiohttp (TraceConfig), обновляющая счётчики."""
+        import aiohttp
+
+        async def on_create(session, context, params):
+            self.created += 1
+
+        async def on_reuse(session, context, params):
+            self.reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+
+def create_session(stats=None, pool_size=POOL_SIZE,
+                   pool_per_host=POOL_PER_HOST,
+                   keepalive_timeout=KEEPALIVE_TIMEOUT):
+    """Создаёт aiohttp-сессию с keep-alive пулом соединений."""
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_per_host,
+        keepalive_timeout=keepalive_timeout,
+    )
+    trace_configs = [stats.trace_config()] if stats is not None else None
+    # Потолок для запросов, которым не передали свой срок.
+    timeout = aiohttp.ClientTimeout(
+        total=POLL_BUDGET, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector, timeout=timeout, trace_configs=trace_configs)
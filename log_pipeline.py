@@ -0,0 +1,139 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+TEXT_FORMAT = (
+    '%(asctime)s - [%(levelname)s][%(lineno)s][%(filename)s]'
+    '[%(funcName)s]- %(message)s'
+)
+# Окно, в котором считаем повторы одной и той же info-строки, в секундах.
+SAMPLE_WINDOW = 60
+
+# id токена, который опрашивает текущая задача asyncio.
+TENANT = contextvars.ContextVar('tenant', default=None)
+
+
+class TenantFilter(logging.Filter):
+    """Подписывает запись id токена из TENANT."""
+
+    def filter(self, record):
+        """Подставляет в запись id токена из контекста опроса."""
+        if not hasattr(record, 'tenant'):
+            record.tenant = TENANT.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает не больше limit одинаковых info-строк за window секунд.
+
+    Одинаковые — с тем же шаблоном msg, аргументы не учитываются.
+    Предупреждения и ошибки проходят всегда. Первая запись нового окна
+    несёт в поле suppressed число отброшенных в прошлом окне.
+    """
+
+    def __init__(self, limit, window=SAMPLE_WINDOW, clock=time.monotonic):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self._seen = {}
+
+    def filter(self, record):
+        """Пропускает запись, если лимит копий за окно не исчерпан."""
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno, record.msg)
+        now = self.clock()
+        started, passed, dropped = self._seen.get(key, (now, 0, 0))
+        if now - started >= self.window:
+            if dropped:
+                record.suppressed = dropped
+            started, passed, dropped = now, 0, 0
+        if passed >= self.limit:
+            self._seen[key] = (started, passed, dropped + 1)
+            return False
+        self._seen[key] = (started, passed + 1, dropped)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON."""
+
+    def format(self, record):
+        """Запись лога одной строкой JSON."""
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'function': record.funcName,
+        }
+        for field in ('tenant', 'suppressed'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись до очереди.
+
+    Стандартный prepare() сразу склеивает сообщение с аргументами;
+    здесь это делается в фоновом потоке, исключение же превращается в
+    текст заранее, чтобы не держать в очереди кадры стека.
+    """
+
+    def prepare(self, record):
+        """Готовит запись к передаче в поток записи."""
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class QueueListener(logging.handlers.QueueListener):
+    """QueueListener, который можно останавливать повторно."""
+
+    def stop(self):
+        """Останавливает поток записи, если он запущен."""
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_logging(json_format=False, use_queue=False, sample=0,
+                  stream=None):
+    """Настраивает корневой логгер; возвращает QueueListener или None.
+
+    С use_queue запись в stream уходит в фоновый поток: вызовы logging
+    только кладут запись в очередь. Фильтры работают до очереди, в
+    потоке вызова, поэтому id токена берётся из нужного контекста.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    listener = None
+    if use_queue:
+        listener = QueueListener(
+            queue.SimpleQueue(), handler, respect_handler_level=True)
+        handler = QueueHandler(listener.queue)
+    handler.addFilter(TenantFilter())
+    if sample:
+        handler.addFilter(SamplingFilter(sample))
+    logging.basicConfig(level=logging.INFO, handlers=[handler], force=True)
+    if listener is not None:
+        listener.start()
+        atexit.register(listener.stop)
+    return listener
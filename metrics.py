@@ -0,0 +1,259 @@
+import asyncio
+import functools
+import time
+
+# Границы корзин гистограмм задержек, в секундах.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOOP_LAG_INTERVAL = 1.0
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n'))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """Метрика с необязательными метками в формате Prometheus."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def labels(self, *values):
+        """Дочерняя метрика с конкретными значениями меток."""
+        return _Child(self, tuple(str(value) for value in values))
+
+    def samples(self):
+        """Пары (суффикс имени и метки, значение) для экспорта."""
+        for values, value in sorted(self._values.items()):
+            yield _format_labels(self.labelnames, values), value
+
+    def expose(self):
+        """Метрика в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for labels, value in self.samples():
+            lines.append(f'{self.name}{labels} {value}')
+        return '\n'.join(lines)
+
+
+class _Child:
+
+    def __init__(self, metric, values):
+        self._metric = metric
+        self._values = values
+
+    def __getattr__(self, name):
+        method = getattr(self._metric, name)
+        return functools.partial(method, labels=self._values)
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, labels=()):
+        """Увеличивает счётчик на amount."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        """Текущее значение счётчика."""
+        return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    """Текущее значение; может считаться функцией в момент экспорта."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, labels=()):
+        """Задаёт значение датчика."""
+        self._values[labels] = value
+
+    def set_function(self, function):
+        """Значение будет браться из function() при каждом экспорте."""
+        self._function = function
+
+    def samples(self):
+        """Пары (метки, значение) для экспорта."""
+        if self._function is not None:
+            yield '', self._function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        """Учитывает наблюдение value в корзинах гистограммы."""
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * len(self.buckets) + [0, 0]
+        for number, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[number] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def count(self, labels=()):
+        """Сколько наблюдений учтено."""
+        state = self._values.get(labels)
+        return state[-1] if state else 0
+
+    def expose(self):
+        """Гистограмма в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for values, state in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, state):
+                labels = _format_labels(
+                    self.labelnames, values, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labelnames, values, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{labels} {state[-1]}')
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {state[-2]}')
+            lines.append(f'{self.name}_count{labels} {state[-1]}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Добавляет метрику в реестр и возвращает её."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        """Создаёт и регистрирует счётчик."""
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        """Создаёт и регистрирует датчик."""
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        """Создаёт и регистрирует гистограмму."""
+        return self.register(Histogram(*args, **kwargs))
+
+    def expose(self):
+        """Все метрики в текстовом формате Prometheus."""
+        return '\n'.join(
+            metric.expose() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+PRACTICUM_REQUESTS = REGISTRY.counter(
+    'practicum_requests_total',
+    'Запросы к API Практикума по коду ответа или типу исключения',
+    ['outcome'])
+PRACTICUM_LATENCY = REGISTRY.histogram(
+    'practicum_request_seconds', 'Длительность запроса к API Практикума')
+VALIDATION_FAILURES = REGISTRY.counter(
+    'validation_failures_total', 'Ответы API, не прошедшие проверку',
+    ['stage'])
+TELEGRAM_MESSAGES = REGISTRY.counter(
+    'telegram_messages_total', 'Отправки сообщений в Телеграм', ['result'])
+TELEGRAM_LATENCY = REGISTRY.histogram(
+    'telegram_send_seconds', 'Длительность отправки в Телеграм')
+LOOP_LAG = REGISTRY.histogram(
+    'event_loop_lag_seconds', 'Опоздание цикла событий относительно таймера')
+DELIVERY_QUEUE = REGISTRY.gauge(
+    'delivery_queue_messages', 'Сообщения, ждущие отправки')
+CONNECTIONS_CREATED = REGISTRY.gauge(
+    'http_connections_created', 'Новые HTTP-соединения с начала работы')
+CONNECTIONS_REUSED = REGISTRY.gauge(
+    'http_connections_reused', 'Переиспользованные HTTP-соединения')
+TENANTS = REGISTRY.gauge('tenants', 'Подписки в расписании опроса')
+UPSTREAM_TIMEOUTS = REGISTRY.counter(
+    'upstream_timeouts_total',
+    'Вызовы внешних сервисов, прерванные по таймауту', ['upstream'])
+CIRCUIT_STATE = REGISTRY.gauge(
+    'circuit_state',
+    'Предохранитель внешнего сервиса: 0 замкнут, 1 пробный вызов, 2 разомкнут',
+    ['upstream'])
+CIRCUIT_REJECTED = REGISTRY.counter(
+    'circuit_rejected_total',
+    'Вызовы, отклонённые разомкнутым предохранителем', ['upstream'])
+RESPONSE_CACHE = REGISTRY.counter(
+    'practicum_response_cache_total',
+    'Ответы API: hit — совпали с прошлым и не разбирались, miss — новые',
+    ['result'])
+RATE_LIMITED = REGISTRY.gauge(
+    'practicum_rate_limited_requests',
+    'Запросы к API Практикума, ждущие слота лимитера')
+
+
+def count_failures(stage):
+    """Декоратор: считает исключения функции в VALIDATION_FAILURES."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                VALIDATION_FAILURES.labels(stage).inc()
+                raise
+        return wrapper
+    return decorator
+
+
+async def monitor_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Меряет, насколько позже срока просыпается цикл событий."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(
+            max(time.perf_counter() - started - interval, 0))
+
+
+async def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Поднимает /metrics; возвращает AppRunner для остановки."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(
+            text=registry.expose(),
+            content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,85 @@
+import logging
+from enum import IntEnum
+
+HOMEWORK_VERDICTS = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+    'rejected': 'Работа проверена: у ревьюера есть замечания.',
+}
+MESSAGE_PREFIX = 'Изменился статус проверки работы "'
+
+
+class Status(IntEnum):
+    """Статус проверки работы; в памяти это небольшое число."""
+
+    REVIEWING = 0
+    APPROVED = 1
+    REJECTED = 2
+
+    @property
+    def api_name(self):
+        """Статус так, как его пишет API Практикума."""
+        return _API_NAMES[self]
+
+    @property
+    def verdict(self):
+        """Текст вердикта для сообщения о статусе."""
+        return HOMEWORK_VERDICTS[_API_NAMES[self]]
+
+    @classmethod
+    def parse(cls, value):
+        """Статус по строке из ответа API."""
+        try:
+            return _BY_API_NAME[value]
+        except (KeyError, TypeError):
+            logging.error('Неизвестный статус')
+            raise KeyError('Неизвестный статус')
+
+
+_API_NAMES = {status: status.name.lower() for status in Status}
+_BY_API_NAME = {name: status for status, name in _API_NAMES.items()}
+# Хвосты сообщений собраны один раз, при разборе остаётся склеить строки.
+_MESSAGE_SUFFIXES = tuple(f'". {status.verdict}' for status in Status)
+
+
+class Homework:
+    """Компактная запись о работе: id, название и статус."""
+
+    __slots__ = ('id', 'name', 'status', 'seen_at')
+
+    def __init__(self, id, name, status, seen_at=0):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.seen_at = seen_at
+
+    def __repr__(self):
+        return (f'Homework(id={self.id!r}, name={self.name!r}, '
+                f'status={self.status.api_name})')
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return ((self.id, self.name, self.status)
+                == (other.id, other.name, other.status))
+
+    @classmethod
+    def from_api(cls, homework):
+        """Проверяет словарь работы из ответа API и сжимает его."""
+        if not isinstance(homework, dict):
+            logging.error('Работа в ответе API не словарь')
+            raise TypeError('Работа в ответе API не словарь')
+        if 'homework_name' not in homework:
+            logging.error('В ответе API нет ключа homework_name')
+            raise KeyError('В ответе API нет ключа homework_name')
+        if 'status' not in homework:
+            logging.error('В ответе API нет ключа homework_status')
+            raise KeyError('В ответе API нет ключа homework_status')
+        name = homework['homework_name']
+        return cls(homework.get('id', name), name,
+                   Status.parse(homework['status']))
+
+    @property
+    def message(self):
+        """Текст уведомления о смене статуса."""
+        return MESSAGE_PREFIX + str(self.name) + _MESSAGE_SUFFIXES[self.status]
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from collections import deque
+
+# Общий лимит запросов к API Практикума: чуть ниже его собственного
+# порога, чтобы пачка подписок не упиралась в 429 для всех сразу.
+PRACTICUM_RATE = 10
+PRACTICUM_BURST = 10
+# Лимит на один токен Практикума.
+TOKEN_RATE = 0.2
+TOKEN_BURST = 3
+# С какого числа вёдер токенов начинаем выбрасывать заполненные.
+PRUNE_AT = 1024
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity за раз."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def full(self):
+        """Ведро заполнено, то есть лимит сейчас не расходуется."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+    def delay(self, tokens=1):
+        """Сколько секунд ждать, пока наберётся нужное число токенов."""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        """Забирает токены, если их хватает."""
+        if self.delay(tokens) > 0:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+class FairLimiter:
+    """Общий и потокенный лимит запросов с честной очередью.
+
+    Запрос получает слот, когда есть токены и в общем ведре, и в ведре
+    его токена. Ждущие токены обслуживаются по кругу: за один проход
+    токену достаётся weights.get(token, 1) слотов, поэтому шумный
+    аккаунт не задерживает остальных дольше одного круга.
+    """
+
+    def __init__(self, rate=PRACTICUM_RATE, burst=PRACTICUM_BURST,
+                 token_rate=TOKEN_RATE, token_burst=TOKEN_BURST,
+                 weights=None, clock=time.monotonic):
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.weights = weights or {}
+        self.clock = clock
+        self._global = TokenBucket(rate, burst, clock)
+        self._buckets = {}
+        self._waiters = {}
+        self._ring = deque()
+        self._credits = {}
+        self._timer = None
+        self._prune_at = PRUNE_AT
+
+    def __len__(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            bucket = self._buckets[token] = TokenBucket(
+                self.token_rate, self.token_burst, self.clock)
+        return bucket
+
+    def _take(self, token):
+        self._global.try_acquire()
+        self._bucket(token).try_acquire()
+        if len(self._buckets) >= self._prune_at:
+            # Заполненное ведро ничем не отличается от нового.
+            self._buckets = {
+                key: bucket for key, bucket in self._buckets.items()
+                if key in self._waiters or not bucket.full
+            }
+            self._prune_at = max(PRUNE_AT, 2 * len(self._buckets))
+
+    async def acquire(self, token):
+        """Ждёт слота для запроса от имени token."""
+        if (not self._waiters and self._global.delay() == 0
+                and self._bucket(token).delay() == 0):
+            self._take(token)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        if token not in self._waiters:
+            self._waiters[token] = deque()
+            self._ring.append(token)
+        self._waiters[token].append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.done() or waiter.cancelled():
+                self._discard(token, waiter)
+            else:
+                # Слот уже выдан: отдаём его следующему.
+                self._dispatch()
+            raise
+
+    def _discard(self, token, waiter):
+        waiters = self._waiters.get(token)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            self._drop(token)
+
+    def _drop(self, token):
+        del self._waiters[token]
+        self._ring.remove(token)
+        self._credits.pop(token, None)
+
+    def _dispatch(self):
+        """Выдаёт слоты по кругу, пока хватает токенов."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        wait = None
+        blocked = 0
+        while self._ring and blocked < len(self._ring):
+            global_delay = self._global.delay()
+            if global_delay > 0:
+                wait = global_delay
+                break
+            token = self._ring[0]
+            token_delay = self._bucket(token).delay()
+            if token_delay > 0:
+                # Токен упёрся в свой лимит: пропускаем его ход.
+                wait = token_delay if wait is None else min(wait, token_delay)
+                blocked += 1
+                self._credits.pop(token, None)
+                self._ring.rotate(-1)
+                continue
+            blocked = 0
+            waiter = self._waiters[token].popleft()
+            if waiter.cancelled():
+                if not self._waiters[token]:
+                    self._drop(token)
+                continue
+            self._take(token)
+            waiter.set_result(None)
+            credits = self._credits.get(
+                token, self.weights.get(token, 1)) - 1
+            if not self._waiters[token]:
+                self._drop(token)
+            elif credits > 0:
+                self._credits[token] = credits
+            else:
+                self._credits.pop(token, None)
+                self._ring.rotate(-1)
+        if self._ring and wait is not None:
+            self._timer = asyncio.get_running_loop().call_later(
+                wait, self._dispatch)
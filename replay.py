@@ -0,0 +1,334 @@
+"""Запись трафика к API Практикума и Телеграму и его воспроизведение.
+
+RecordingSession оборачивает сессию aiohttp и пишет ответы
+homework_statuses и отправки sendMessage в сжатый журнал JSON-строк.
+ReplaySession отвечает по такому журналу вместо сети, а replay()
+прогоняет через неё настоящий PollingEngine на виртуальных часах:
+неделя трафика проигрывается за секунды.
+"""
+import asyncio
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict
+from typing import NamedTuple
+
+import homework
+from delivery import MESSAGE_SEPARATOR
+
+# Минимальный шаг виртуальных часов, чтобы не крутиться на месте.
+MIN_STEP = 0.001
+
+
+def token_id(token):
+    """Отпечаток токена: в журнал сами токены не попадают."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _token(headers):
+    return headers['Authorization'].split(' ', 1)[1]
+
+
+class RecordedResponse:
+    """Ответ из журнала с нужной homework частью интерфейса aiohttp."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def read(self):
+        """Тело ответа в байтах."""
+        return self._body
+
+    async def json(self, content_type=None):
+        """Тело ответа, разобранное как JSON."""
+        return json.loads(self._body)
+
+
+class TrafficLog:
+    """Журнал трафика: JSON-строки в gzip, дописывается по событию."""
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+
+    def write(self, kind, at=None, **fields):
+        """Пишет событие; at — его момент, по умолчанию сейчас."""
+        at = self.clock() if at is None else at
+        event = {'t': round(at, 3), 'k': kind, **fields}
+        self._file.write(
+            json.dumps(event, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+
+    def tenant(self, tenant):
+        """Записывает подписку, чтобы воспроизвести её расписание."""
+        self.write('tenant', who=token_id(tenant.practicum_token),
+                   chat=str(tenant.chat_id))
+
+    def close(self):
+        """Закрывает файл журнала."""
+        self._file.close()
+
+
+def load_traffic(path):
+    """События журнала; оборванный при падении хвост отбрасывается."""
+    events = []
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as traffic:
+            for line in traffic:
+                events.append(json.loads(line))
+    except (EOFError, gzip.BadGzipFile, zlib.error,
+            json.JSONDecodeError) as error:
+        logging.warning(
+            'Журнал %s оборван после %s событий: %s',
+            path, len(events), error)
+    return events
+
+
+class _Request:
+    """Результат get/post, годный для async with, как в aiohttp."""
+
+    def __init__(self, coroutine):
+        self._coroutine = coroutine
+
+    def __await__(self):
+        return self._coroutine.__await__()
+
+    async def __aenter__(self):
+        return await self._coroutine
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class RecordingSession:
+    """Сессия aiohttp, которая пишет трафик бота в TrafficLog.
+
+    Остальные запросы, например getUpdates диспетчера, идут мимо
+    журнала как есть.
+    """
+
+    def __init__(self, session, log):
+        self.session = session
+        self.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, **kwargs):
+        """Запрос к API Практикума пишется в журнал, остальные идут мимо."""
+        if not url.startswith(homework.ENDPOINT):
+            return self.session.get(url, **kwargs)
+        return _Request(self._record_poll(url, kwargs))
+
+    def post(self, url, **kwargs):
+        """Отправка сообщения пишется в журнал, остальные запросы идут мимо."""
+        if not url.endswith('/sendMessage'):
+            return self.session.post(url, **kwargs)
+        return _Request(self._record_send(url, kwargs))
+
+    async def _exchange(self, request, url, kwargs, event):
+        # Момент запроса, а не ответа: при воспроизведении опрос в то же
+        # время должен получить этот ответ.
+        event['at'] = self.log.clock()
+        try:
+            async with request(url, **kwargs) as response:
+                body = await response.read()
+        except asyncio.TimeoutError:
+            self.log.write(error='timeout', **event)
+            raise
+        except Exception:
+            self.log.write(error='connection', **event)
+            raise
+        headers = {
+            name: response.headers[name]
+            for name in ('ETag', 'Last-Modified') if name in response.headers
+        }
+        self.log.write(status=response.status, headers=headers,
+                       body=body.decode('utf-8', 'replace'), **event)
+        return RecordedResponse(response.status, headers, body)
+
+    async def _record_poll(self, url, kwargs):
+        return await self._exchange(self.session.get, url, kwargs, {
+            'kind': 'poll',
+            'who': token_id(_token(kwargs['headers'])),
+            'from_date': kwargs['params']['from_date'],
+        })
+
+    async def _record_send(self, url, kwargs):
+        payload = kwargs['json']
+        return await self._exchange(self.session.post, url, kwargs, {
+            'kind': 'send',
+            'chat': str(payload['chat_id']),
+            'text': payload['text'],
+        })
+
+
+class ReplaySession:
+    """Подмена сессии aiohttp, отвечающая по журналу трафика.
+
+    На опрос отвечает последний записанный ответ для того же токена,
+    полученный не позже текущего виртуального времени, — так смена
+    расписания опроса видна так же, как видна была бы на проде.
+    Отправки в Телеграм всегда удачны и копятся в sent.
+    """
+
+    def __init__(self, events, clock):
+        self.clock = clock
+        self.polls = 0
+        self.sent = []
+        self._times = defaultdict(list)
+        self._answers = defaultdict(list)
+        for event in events:
+            if event['k'] == 'poll':
+                self._times[event['who']].append(event['t'])
+                self._answers[event['who']].append(event)
+
+    async def close(self):
+        """Закрывать нечего: сессия ничего не открывает."""
+
+    def get(self, url, headers=None, **kwargs):
+        """Ответ API из журнала для токена из заголовков."""
+        return _Request(self._poll(headers))
+
+    def post(self, url, json=None, **kwargs):
+        """Учитывает отправку сообщения без обращения к сети."""
+        return _Request(self._send(json))
+
+    async def _poll(self, headers):
+        self.polls += 1
+        who = _token(headers)
+        answers = self._answers.get(who)
+        if not answers:
+            return RecordedResponse(404, {}, b'{}')
+        index = max(bisect.bisect_right(self._times[who], self.clock()), 1)
+        event = answers[index - 1]
+        recorded = event.get('headers', {})
+        etag = recorded.get('ETag')
+        if etag and headers.get('If-None-Match') == etag:
+            return RecordedResponse(304, recorded, b'')
+        # На 304 в журнале нет тела: берём последний полный ответ.
+        while event.get('status') == 304 and index > 1:
+            index -= 1
+            event = answers[index - 1]
+        if event.get('error') == 'timeout':
+            raise asyncio.TimeoutError()
+        if event.get('error'):
+            import aiohttp
+
+            raise aiohttp.ClientConnectionError('Сбой соединения из журнала')
+        return RecordedResponse(
+            event['status'], event.get('headers', {}),
+            event['body'].encode())
+
+    async def _send(self, payload):
+        self.sent.append(
+            (self.clock(), str(payload['chat_id']), payload['text']))
+        return RecordedResponse(200, {}, b'{"ok": true}')
+
+
+class VirtualClock:
+    """Часы, которые идут только по команде."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        """Текущее виртуальное время."""
+        return self.now
+
+    def advance(self, seconds):
+        """Сдвигает виртуальное время вперёд."""
+        self.now += max(seconds, MIN_STEP)
+
+
+class ReplayResult(NamedTuple):
+    """Итог воспроизведения против записанных отправок."""
+
+    polls: int
+    sent: int
+    matched: int
+    missed: int
+    extra: int
+    # Задержки уведомлений относительно записи, в секундах.
+    delays: list
+    virtual_seconds: float
+    wall_seconds: float
+
+
+def _messages(sends):
+    """(чат, текст) по отдельным сообщениям, склейки разбираются."""
+    for moment, chat, text in sends:
+        for message in text.split(MESSAGE_SEPARATOR):
+            yield moment, chat, message
+
+
+def compare(recorded, replayed):
+    """Сопоставляет отправки: (совпало, задержки, пропущено, лишние)."""
+    expected = defaultdict(list)
+    for moment, chat, message in _messages(recorded):
+        expected[chat, message].append(moment)
+    delays = []
+    extra = 0
+    for moment, chat, message in _messages(replayed):
+        moments = expected.get((chat, message))
+        if moments:
+            delays.append(moment - moments.pop(0))
+        else:
+            extra += 1
+    missed = sum(len(moments) for moments in expected.values())
+    return len(delays), delays, missed, extra
+
+
+async def replay(events, **engine_kwargs):
+    """Прогоняет журнал через PollingEngine на виртуальных часах."""
+    from engine import PollingEngine
+    from tenants import Tenant
+
+    started = time.perf_counter()
+    moments = [event['t'] for event in events]
+    start, end = min(moments), max(moments)
+    # Подписки из начала журнала были при запуске, остальные
+    # оформлены на ходу и добавляются в записанный момент.
+    joins = [(event['t'], Tenant(event['who'], event['chat']))
+             for event in events if event['k'] == 'tenant']
+    tenants = list(dict.fromkeys(
+        tenant for moment, tenant in joins if moment <= start))
+    joins = [(moment, tenant) for moment, tenant in joins if moment > start]
+    clock = VirtualClock(start)
+    session = ReplaySession(events, clock)
+    engine = PollingEngine(
+        session, 'replay', tenants, clock=clock, **engine_kwargs)
+    while clock() <= end:
+        while joins and joins[0][0] <= clock():
+            engine.add_tenant(joins.pop(0)[1])
+        engine.run_pending()
+        await engine.drain()
+        # Прыгаем сразу к ближайшему опросу, отправке или подписке.
+        waits = [engine.delivery.flush_ready()]
+        if engine.next_poll_at() is not None:
+            waits.append(engine.next_poll_at() - clock())
+        if joins:
+            waits.append(joins[0][0] - clock())
+        clock.advance(min(
+            (wait for wait in waits if wait is not None), default=MIN_STEP))
+    recorded = [
+        (event['t'], event['chat'], event['text']) for event in events
+        if event['k'] == 'send' and event.get('status') == 200
+    ]
+    matched, delays, missed, extra = compare(recorded, session.sent)
+    return ReplayResult(
+        session.polls, len(session.sent), matched, missed, extra, delays,
+        clock() - start, time.perf_counter() - started)
@@ -0,0 +1,91 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import NamedTuple
+
+from metrics import RESPONSE_CACHE
+
+# Сколько токенов Практикума помним, прежде чем вытеснять старые.
+MAX_ENTRIES = 100_000
+# current_date меняется в каждом ответе, в отпечаток его не берём.
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+
+def fingerprint(body):
+    """Отпечаток тела ответа без current_date."""
+    return hashlib.blake2b(
+        CURRENT_DATE.sub(b'', body), digest_size=16).digest()
+
+
+class CachedResponse(NamedTuple):
+    """Последний разобранный ответ API по токену.
+
+    Работы хранятся компактными записями Homework: остальные поля
+    ответа, например комментарии ревьюера, в кэш не попадают.
+    """
+
+    from_date: int
+    current_date: int
+    etag: str
+    last_modified: str
+    fingerprint: bytes
+    homeworks: tuple
+
+
+class ResponseCache:
+    """Последние ответы API по токенам Практикума.
+
+    Валидаторы ETag и Last-Modified привязаны к запросу, поэтому
+    условные заголовки уходят, только пока from_date не изменился.
+    Отпечаток тела сравнивается при любом from_date: совпал — ответ
+    не разбираем повторно, current_date достаём из тела регуляркой.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def conditional_headers(self, token, from_date):
+        """If-None-Match и If-Modified-Since для повторного запроса."""
+        cached = self._entries.get(token)
+        if cached is None or cached.from_date != from_date:
+            return {}
+        headers = {}
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    async def resolve(self, token, from_date, status, headers, body, parse):
+        """Ответ из кэша или разобранный parse(body), если он новый.
+
+        parse — корутина, которая возвращает словарь с homeworks из
+        записей Homework и current_date, как read_homework_statuses.
+        """
+        cached = self._entries.get(token)
+        if cached is not None and status == 304:
+            RESPONSE_CACHE.labels('hit').inc()
+            self._entries.move_to_end(token)
+            return cached
+        digest = fingerprint(body)
+        if cached is not None and cached.fingerprint == digest:
+            RESPONSE_CACHE.labels('hit').inc()
+            homeworks = cached.homeworks
+            match = CURRENT_DATE.search(body)
+            current_date = int(match.group(1)) if match else None
+        else:
+            RESPONSE_CACHE.labels('miss').inc()
+            parsed = await parse(body)
+            homeworks = tuple(parsed['homeworks'])
+            current_date = parsed['current_date']
+        cached = self._entries[token] = CachedResponse(
+            from_date, current_date, headers.get('ETag'),
+            headers.get('Last-Modified'), digest, homeworks)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
@@ -0,0 +1,94 @@
+import random
+from dataclasses import dataclass, field
+
+from homework import RETRY_TIME
+from models import Status
+
+# Пока работа на ревью, ответ ревьюера ждём чаще обычного.
+REVIEWING_TIME = 120
+# После стольких опросов без изменений подписка считается простаивающей.
+IDLE_AFTER = 6
+IDLE_TIME = 1800
+MAX_ERROR_TIME = 3600
+JITTER = 0.1
+
+
+@dataclass
+class TenantState:
+    """Что планировщик знает о токене после очередного опроса."""
+
+    errors: int = 0
+    idle_polls: int = 0
+    reviewing: set = field(default_factory=set)
+    # Отпечаток последнего разобранного ответа API.
+    fingerprint: bytes = None
+
+    def record_success(self, transitions):
+        """Учитывает удачный опрос и пары (работа, статус) со сменой."""
+        self.errors = 0
+        if transitions:
+            self.idle_polls = 0
+        else:
+            self.idle_polls += 1
+        for key, status in transitions:
+            if status == Status.REVIEWING:
+                self.reviewing.add(key)
+            else:
+                self.reviewing.discard(key)
+
+    def record_error(self):
+        """Учитывает неудачный опрос."""
+        self.errors += 1
+
+
+class FixedPolicy:
+    """Опрос через равные промежутки, как было с RETRY_TIME."""
+
+    def __init__(self, retry_time=RETRY_TIME):
+        self.retry_time = retry_time
+
+    def next_delay(self, state):
+        """Пауза до следующего опроса подписки."""
+        return self.retry_time
+
+
+class AdaptivePolicy:
+    """Подстраивает частоту опроса под состояние подписки.
+
+    Ошибки дают экспоненциальный backoff: первая пауза после ошибки
+    не короче retry_time, так что сбой API только сокращает число
+    запросов. Работа на ревью ускоряет опрос, долгое отсутствие
+    изменений его замедляет. К паузе добавляется разброс, чтобы
+    подписки не синхронизировались.
+    """
+
+    def __init__(self, retry_time=RETRY_TIME, reviewing_time=REVIEWING_TIME,
+                 idle_after=IDLE_AFTER, idle_time=IDLE_TIME,
+                 error_time=None, max_error_time=MAX_ERROR_TIME,
+                 jitter=JITTER, random=random.random):
+        self.retry_time = retry_time
+        self.reviewing_time = reviewing_time
+        self.idle_after = idle_after
+        self.idle_time = idle_time
+        self.error_time = (
+            retry_time if error_time is None
+            else max(error_time, retry_time))
+        self.max_error_time = max_error_time
+        self.jitter = jitter
+        self.random = random
+
+    def base_delay(self, state):
+        """Пауза до следующего опроса без учёта разброса."""
+        if state.errors:
+            return min(self.error_time * 2 ** (state.errors - 1),
+                       self.max_error_time)
+        if state.reviewing:
+            return self.reviewing_time
+        if state.idle_polls >= self.idle_after:
+            return self.idle_time
+        return self.retry_time
+
+    def next_delay(self, state):
+        """Пауза до следующего опроса подписки."""
+        spread = (2 * self.random() - 1) * self.jitter
+        return self.base_delay(state) * (1 + spread)
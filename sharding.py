@@ -0,0 +1,298 @@
+import asyncio
+import bisect
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from cursors import CursorStore
+from exceptions import TenantConfigError
+from hot_reload import spread
+from tenants import load_tenants
+
+# Сколько точек на кольце у каждого шарда: больше — ровнее раскладка.
+REPLICAS = 100
+CHECK_INTERVAL = 1.0
+# Шард, упавший MAX_RESTARTS раз за RESTART_WINDOW секунд, выводится
+# из кольца, а его подписки переходят к живым шардам.
+MAX_RESTARTS = 5
+RESTART_WINDOW = 300
+RESTART_BACKOFF = 1
+MAX_RESTART_BACKOFF = 60
+# Сколько ждём, пока остановленный шард доведёт отправки, в секундах.
+STOP_TIMEOUT = 40
+CURSORS_PATTERN = 'cursors-{shard}.json'
+ERRORS_PATTERN = 'errors-{shard}.json'
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Консистентное хеширование подписок по шардам."""
+
+    def __init__(self, nodes, replicas=REPLICAS):
+        self.nodes = sorted(nodes)
+        points = sorted(
+            (_hash(f'{node}:{replica}'), node)
+            for node in self.nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        """Шард, которому принадлежит ключ."""
+        if not self._nodes:
+            raise LookupError('В кольце нет шардов')
+        index = bisect.bisect(self._hashes, _hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def read_cursors(cursors_dir):
+    """Курсоры всех шардов; для каждого токена берётся самый свежий."""
+    merged = {}
+    pattern = os.path.join(cursors_dir, CURSORS_PATTERN.format(shard='*'))
+    for path in glob.glob(pattern):
+        store = CursorStore(path)
+        for key, from_date in store.items():
+            merged[key] = max(merged.get(key, 0), from_date)
+    return merged
+
+
+class ShardTenants:
+    """Подписки одного шарда при текущем составе кольца.
+
+    Подписки раскладываются по токену Практикума: все подписки токена
+    попадают в один шард и опрашиваются одним запросом.
+    """
+
+    def __init__(self, shard, tenants, cursors_dir):
+        self.shard = shard
+        self.tenants = list(tenants)
+        self.cursors_dir = cursors_dir
+        self.alive = None
+
+    def owned(self, alive):
+        """Подписки этого шарда при живых шардах alive."""
+        self.alive = alive
+        ring = HashRing(alive)
+        return [tenant for tenant in self.tenants
+                if ring.node_for(tenant.token_id) == self.shard]
+
+    def adopt(self, engine, tenants):
+        """Добавляет в движок подписки, перешедшие от других шардов.
+
+        Курсор берётся из файлов всех шардов, чтобы продолжить опрос
+        с того места, где остановился прежний владелец.
+        """
+        cursors = read_cursors(self.cursors_dir)
+        for tenant in tenants:
+            from_date = cursors.get(tenant.token_id)
+            if from_date is not None:
+                engine.cursors.advance(tenant.token_id, from_date)
+        # Вразброс, чтобы старт шарда не бил API всеми подписками сразу.
+        spread(engine, tenants)
+
+    def rebalance(self, engine, alive):
+        """Оставляет в движке только подписки шарда в кольце alive."""
+        owned = self.owned(alive)
+        owned_keys = {tenant.key for tenant in owned}
+        for tenant in self.tenants:
+            if tenant.key not in owned_keys:
+                engine.remove_tenant(tenant)
+        self.adopt(engine, owned)
+        engine.checkpoint(force=True)
+
+    def reload(self, engine, path):
+        """Перечитывает файл подписок и применяет его к доле шарда."""
+        try:
+            tenants = load_tenants(path)
+        except TenantConfigError as error:
+            logging.error('Реестр подписок не перечитан: %s', error)
+            return
+        keys = {tenant.key for tenant in tenants}
+        for tenant in self.tenants:
+            if tenant.key not in keys:
+                engine.remove_tenant(tenant)
+        self.tenants = tenants
+        self.rebalance(engine, self.alive)
+        logging.info('Шард %s: реестр перечитан, подписок %s',
+                     self.shard, len(engine))
+
+    async def follow(self, connection, engine):
+        """Применяет новые составы кольца, присланные супервизором."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(connection.fileno(), ready.set)
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                while connection.poll():
+                    alive = connection.recv()
+                    self.rebalance(engine, alive)
+                    logging.info(
+                        'Шард %s: кольцо %s, подписок %s',
+                        self.shard, alive, len(engine))
+        finally:
+            loop.remove_reader(connection.fileno())
+
+
+def run_shard(shard, alive, connection, config):
+    """Точка входа процесса-шарда."""
+    from engine import serve
+    from homework import configure_logging
+
+    configure_logging(config)
+    shard_tenants = ShardTenants(
+        shard, load_tenants(config.tenants_file), config.cursors_dir)
+    owned = shard_tenants.owned(alive)
+    cursors_file = os.path.join(
+        config.cursors_dir, CURSORS_PATTERN.format(shard=shard))
+    logging.info('Шард %s запущен, подписок: %s', shard, len(owned))
+
+    async def follow(engine):
+        shard_tenants.adopt(engine, owned)
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, shard_tenants.reload, engine, config.tenants_file)
+        await shard_tenants.follow(connection, engine)
+
+    metrics_port = config.metrics_port
+    asyncio.run(serve(
+        config.telegram_token, [], config.pool_options, cursors_file,
+        metrics_port=metrics_port and metrics_port + shard,
+        background=[follow],
+        errors_file=os.path.join(
+            config.cursors_dir, ERRORS_PATTERN.format(shard=shard)),
+        # Шарды делят общие лимиты API, а не берут каждый по целому.
+        **config.shard_rates,
+    ))
+
+
+class Supervisor:
+    """Держит N процессов-шардов и перезапускает упавшие.
+
+    Подписки раскладываются по шардам консистентным хешированием.
+    Шард, который падает слишком часто, выводится из кольца, и живые
+    шарды забирают его подписки вместе с курсорами.
+    """
+
+    def __init__(self, shards, config, process_factory=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.config = config
+        self.clock = clock
+        self.sleep = sleep
+        self.process_factory = process_factory or self._process
+        self.alive = list(range(shards))
+        self._processes = {}
+        self._connections = {}
+        self._crashes = {shard: [] for shard in self.alive}
+        self._restart_at = {}
+
+    @staticmethod
+    def _process(shard, alive, connection, config):
+        return multiprocessing.Process(
+            target=run_shard, name=f'shard-{shard}',
+            args=(shard, alive, connection, config))
+
+    def spawn(self, shard):
+        """Запускает процесс шарда."""
+        parent, child = multiprocessing.Pipe()
+        process = self.process_factory(
+            shard, list(self.alive), child, self.config)
+        process.start()
+        self._processes[shard] = process
+        self._connections[shard] = parent
+
+    def start(self):
+        """Запускает процессы всех живых шардов."""
+        for shard in self.alive:
+            self.spawn(shard)
+
+    def broadcast(self):
+        """Сообщает живым шардам новый состав кольца."""
+        for shard in self.alive:
+            try:
+                self._connections[shard].send(list(self.alive))
+            except (OSError, KeyError):
+                pass
+
+    def retire(self, shard):
+        """Выводит шард из кольца и перераспределяет его подписки."""
+        logging.critical(
+            'Шард %s падает слишком часто, выводим из кольца', shard)
+        self.alive.remove(shard)
+        self._processes.pop(shard, None)
+        self._connections.pop(shard, None)
+        if not self.alive:
+            raise RuntimeError('Не осталось живых шардов')
+        self.broadcast()
+
+    def check(self):
+        """Один проход: находит упавшие шарды и перезапускает их."""
+        now = self.clock()
+        for shard in list(self.alive):
+            process = self._processes.get(shard)
+            restart_at = self._restart_at.get(shard)
+            if restart_at is not None:
+                if now >= restart_at:
+                    del self._restart_at[shard]
+                    self.spawn(shard)
+                continue
+            if process is None or process.is_alive():
+                continue
+            logging.error(
+                'Шард %s завершился с кодом %s', shard, process.exitcode)
+            crashes = [moment for moment in self._crashes[shard]
+                       if now - moment < RESTART_WINDOW] + [now]
+            self._crashes[shard] = crashes
+            if len(crashes) >= MAX_RESTARTS:
+                self.retire(shard)
+                continue
+            backoff = min(RESTART_BACKOFF * 2 ** (len(crashes) - 1),
+                          MAX_RESTART_BACKOFF)
+            self._restart_at[shard] = now + backoff
+
+    def run_forever(self):
+        """Запускает шарды и следит за ними до остановки процесса."""
+        self.start()
+        while True:
+            self.check()
+            self.sleep(CHECK_INTERVAL)
+
+    def forward(self, signum):
+        """Пересылает сигнал живым шардам."""
+        for process in self._processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    def stop(self):
+        """Останавливает шарды и дожидается их завершения."""
+        # SIGTERM: шарды доводят отправки и сохраняют курсоры.
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=STOP_TIMEOUT)
+
+
+def _exit(signum, frame):
+    raise SystemExit(0)
+
+
+def supervise(config):
+    """Запускает супервизор шардов до остановки процесса.
+
+    SIGHUP пересылается шардам: каждый перечитывает файл подписок.
+    """
+    supervisor = Supervisor(config.shards, config)
+    signal.signal(signal.SIGTERM, _exit)
+    signal.signal(
+        signal.SIGHUP, lambda signum, frame: supervisor.forward(signum))
+    try:
+        supervisor.run_forever()
+    finally:
+        supervisor.stop()
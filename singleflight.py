@@ -0,0 +1,30 @@
+import asyncio
+
+
+class SingleFlight:
+    """Склеивает одновременные одинаковые запросы в один.
+
+    Пока запрос по ключу в полёте, следующие вызовы с тем же ключом
+    не идут в сеть, а ждут его результат или исключение.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, factory):
+        """Возвращает результат factory(), общий для всех ждущих по key."""
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: отмена одного ждущего не отменяет запрос для остальных.
+        return await asyncio.shield(task)
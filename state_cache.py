@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+
+from models import Homework
+
+# Сколько статусов работ держим в памяти на процесс.
+MAX_SIZE = 100_000
+# Через сколько секунд без обновлений статус работы забывается.
+TTL = 30 * 24 * 60 * 60
+
+
+class HomeworkStateCache:
+    """Последние увиденные статусы работ с вытеснением по LRU и TTL.
+
+    Ключ записи — пара (владелец, id работы), значение — компактная
+    запись Homework. По владельцу ведётся индекс, чтобы отвечать
+    на /status без обхода всего кэша.
+
+    Со store записи дублируются в постоянное хранилище, и после
+    перезапуска уже известные статусы не сообщаются повторно.
+    """
+
+    def __init__(self, max_size=MAX_SIZE, ttl=TTL, clock=time.time,
+                 store=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.store = store
+        self._states = OrderedDict()
+        self._by_owner = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def _drop(self, key):
+        del self._states[key]
+        owner, _ = key
+        keys = self._by_owner[owner]
+        keys.discard(key)
+        if not keys:
+            del self._by_owner[owner]
+
+    def get(self, key):
+        """Возвращает последнюю запись о работе или None."""
+        homework = self._states.get(key)
+        if homework is None and self.store is not None:
+            homework = self.store.homework(*key)
+            if homework is not None:
+                self._put(key, homework)
+        if homework is None:
+            return None
+        if self.clock() - homework.seen_at > self.ttl:
+            self._drop(key)
+            return None
+        return homework
+
+    def remember(self, key, homework):
+        """Запоминает статус работы и вытесняет самые старые записи."""
+        homework = Homework(
+            homework.id, homework.name, homework.status, self.clock())
+        self._put(key, homework)
+        if self.store is not None:
+            self.store.remember(key[0], homework)
+        self._expire()
+
+    def _put(self, key, homework):
+        self._states[key] = homework
+        self._states.move_to_end(key)
+        self._by_owner.setdefault(key[0], set()).add(key)
+        while len(self._states) > self.max_size:
+            self._drop(next(iter(self._states)))
+
+    def statuses(self, owner):
+        """Статусы всех известных работ владельца: {название: статус}."""
+        statuses = {}
+        if self.store is not None:
+            deadline = self.clock() - self.ttl
+            for homework in self.store.homeworks(owner):
+                if homework.seen_at >= deadline:
+                    statuses[homework.name] = homework.status
+        for key in list(self._by_owner.get(owner, ())):
+            homework = self.get(key)
+            if homework is not None:
+                statuses[homework.name] = homework.status
+        return statuses
+
+    def forget(self, owner):
+        """Удаляет все записи владельца."""
+        for key in list(self._by_owner.get(owner, ())):
+            self._drop(key)
+        if self.store is not None:
+            self.store.forget(owner)
+
+    def _expire(self):
+        deadline = self.clock() - self.ttl
+        while self._states:
+            key = next(iter(self._states))
+            if self._states[key].seen_at >= deadline:
+                break
+            self._drop(key)
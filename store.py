@@ -0,0 +1,332 @@
+import itertools
+import logging
+import sqlite3
+import time
+
+from cursors import CursorStore
+from models import Homework, Status
+from tenants import Tenant, TenantRegistry
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tenants (
+    id TEXT PRIMARY KEY,
+    practicum_token TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'bot'
+);
+CREATE INDEX IF NOT EXISTS tenants_chat ON tenants (chat_id);
+CREATE INDEX IF NOT EXISTS tenants_token ON tenants (practicum_token);
+CREATE TABLE IF NOT EXISTS feeds (
+    id TEXT PRIMARY KEY,
+    cursor INTEGER,
+    next_poll_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS homeworks (
+    tenant_id TEXT NOT NULL,
+    homework_id NOT NULL,
+    name TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (tenant_id, homework_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    delivered_at REAL,
+    failed_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS outbox_key ON outbox (key);
+CREATE INDEX IF NOT EXISTS outbox_pending
+    ON outbox (chat_id, id) WHERE delivered_at IS NULL;
+'''
+# Сколько хранить доставленные и отброшенные сообщения outbox, в секундах.
+# Ключ идемпотентности нужен, пока курсор может откатиться к переходу;
+# недели хватает с большим запасом.
+OUTBOX_RETENTION = 7 * 24 * 60 * 60
+# Как часто чистить outbox, в секундах.
+PRUNE_INTERVAL = 60 * 60
+# Откуда подписка: из файла подписок или от команды /start.
+SOURCE_FILE = 'file'
+SOURCE_BOT = 'bot'
+
+
+def owner_id(owner):
+    """Возвращает id подписки по ключу владельца из HomeworkStateCache."""
+    return Tenant(*owner).id
+
+
+class SqliteStore:
+    """Подписки, курсоры, статусы работ и исходящие сообщения в SQLite.
+
+    База работает в режиме WAL. Записи копятся в памяти и уходят
+    одной транзакцией в commit(), который движок вызывает раз за такт
+    планировщика: работа за такт пропорциональна числу опросов,
+    а не числу подписок.
+    """
+
+    def __init__(self, path, clock=time.time,
+                 outbox_retention=OUTBOX_RETENTION):
+        self.path = path
+        self.clock = clock
+        self.outbox_retention = outbox_retention
+        self._pruned_at = None
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._writes = []
+
+    def close(self):
+        """Сохраняет накопленные записи и закрывает базу."""
+        self.commit()
+        self._db.close()
+
+    def _write(self, sql, params):
+        self._writes.append((sql, params))
+
+    def commit(self):
+        """Выполняет накопленные записи одной транзакцией.
+
+        Раз в PRUNE_INTERVAL туда же добавляется чистка outbox.
+        """
+        now = self.clock()
+        if self._pruned_at is None or now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            self.prune_outbox(now - self.outbox_retention)
+        if not self._writes:
+            return
+        writes, self._writes = self._writes, []
+        self._db.execute('BEGIN')
+        try:
+            # Подряд идущие одинаковые запросы — одним executemany.
+            for sql, group in itertools.groupby(writes, key=lambda w: w[0]):
+                self._db.executemany(sql, [params for _, params in group])
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def load_tenants(self, source=None):
+        """Все подписки или только подписки из источника source."""
+        if source is None:
+            rows = self._db.execute(
+                'SELECT practicum_token, chat_id FROM tenants ORDER BY rowid')
+        else:
+            rows = self._db.execute(
+                'SELECT practicum_token, chat_id FROM tenants '
+                'WHERE source = ? ORDER BY rowid', (source,))
+        return [Tenant(token, chat_id) for token, chat_id in rows]
+
+    def add_tenant(self, tenant, source=SOURCE_BOT):
+        """Добавляет подписку; подписка из файла остаётся за файлом."""
+        if source == SOURCE_FILE:
+            sql = (
+                'INSERT INTO tenants (id, practicum_token, chat_id, source) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET source = excluded.source')
+        else:
+            sql = (
+                'INSERT OR IGNORE INTO tenants '
+                '(id, practicum_token, chat_id, source) VALUES (?, ?, ?, ?)')
+        self._write(
+            sql, (tenant.id, tenant.practicum_token, str(tenant.chat_id),
+                  source))
+
+    def remove_tenant(self, tenant):
+        """Удаляет подписку и её статусы работ."""
+        self._write('DELETE FROM tenants WHERE id = ?', (tenant.id,))
+        self._write('DELETE FROM homeworks WHERE tenant_id = ?', (tenant.id,))
+        # Курсор токена живёт, пока у токена есть подписки.
+        self._write(
+            'DELETE FROM feeds WHERE id = ? AND NOT EXISTS '
+            '(SELECT 1 FROM tenants WHERE practicum_token = ?)',
+            (tenant.token_id, tenant.practicum_token))
+
+    def load_cursors(self):
+        """Курсоры from_date всех токенов: {id токена: from_date}."""
+        return dict(self._db.execute(
+            'SELECT id, cursor FROM feeds WHERE cursor IS NOT NULL'))
+
+    def advance(self, feed_id, from_date):
+        """Сдвигает курсор from_date токена вперёд."""
+        self._write(
+            'INSERT INTO feeds (id, cursor) VALUES (?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET '
+            'cursor = MAX(COALESCE(cursor, 0), excluded.cursor)',
+            (feed_id, from_date))
+
+    def schedule(self, feed_id, next_poll_at):
+        """Запоминает срок следующего опроса токена."""
+        self._write(
+            'INSERT INTO feeds (id, next_poll_at) VALUES (?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET '
+            'next_poll_at = excluded.next_poll_at',
+            (feed_id, next_poll_at))
+
+    def schedules(self):
+        """Сроки следующих опросов всех токенов одним запросом."""
+        return dict(self._db.execute(
+            'SELECT id, next_poll_at FROM feeds '
+            'WHERE next_poll_at IS NOT NULL'))
+
+    def remember(self, owner, homework):
+        """Сохраняет последнюю запись о работе владельца."""
+        self._write(
+            'INSERT OR REPLACE INTO homeworks '
+            '(tenant_id, homework_id, name, status, seen_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (owner_id(owner), homework.id, homework.name,
+             int(homework.status), homework.seen_at))
+
+    def homework(self, owner, homework_id):
+        """Последняя сохранённая запись о работе или None."""
+        row = self._db.execute(
+            'SELECT name, status, seen_at FROM homeworks '
+            'WHERE tenant_id = ? AND homework_id = ?',
+            (owner_id(owner), homework_id)).fetchone()
+        if row is None:
+            return None
+        name, status, seen_at = row
+        return Homework(homework_id, name, Status(status), seen_at)
+
+    def homeworks(self, owner):
+        """Все сохранённые записи о работах владельца."""
+        return [
+            Homework(homework_id, name, Status(status), seen_at)
+            for homework_id, name, status, seen_at in self._db.execute(
+                'SELECT homework_id, name, status, seen_at FROM homeworks '
+                'WHERE tenant_id = ?', (owner_id(owner),))
+        ]
+
+    def forget(self, owner):
+        """Удаляет сохранённые записи о работах владельца."""
+        self._write('DELETE FROM homeworks WHERE tenant_id = ?',
+                    (owner_id(owner),))
+
+    def enqueue_message(self, chat_id, text, key=None):
+        """Кладёт сообщение в outbox в той же транзакции, что и опрос.
+
+        Сообщение с уже известным ключом key повторно не пишется.
+        """
+        self._write(
+            'INSERT OR IGNORE INTO outbox (key, chat_id, text, created_at) '
+            'VALUES (?, ?, ?, ?)', (key, str(chat_id), text, self.clock()))
+
+    def pending_messages(self, chat_id=None, after=0):
+        """Недоставленные сообщения [(id, чат, текст)] с id больше after.
+
+        Сообщения, от которых очередь отказалась, сюда не попадают.
+        """
+        if chat_id is None:
+            return self._db.execute(
+                'SELECT id, chat_id, text FROM outbox '
+                'WHERE id > ? AND delivered_at IS NULL AND failed_at IS NULL '
+                'ORDER BY id', (after,)).fetchall()
+        return self._db.execute(
+            'SELECT id, chat_id, text FROM outbox '
+            'WHERE chat_id = ? AND id > ? AND delivered_at IS NULL '
+            'AND failed_at IS NULL ORDER BY id',
+            (str(chat_id), after)).fetchall()
+
+    def mark_delivered(self, message_ids):
+        """Подтверждает доставку сообщений outbox."""
+        now = self.clock()
+        for message_id in message_ids:
+            self._write('UPDATE outbox SET delivered_at = ? WHERE id = ?',
+                        (now, message_id))
+
+    def prune_outbox(self, before):
+        """Удаляет сообщения, доставленные или отброшенные раньше before."""
+        self._write('DELETE FROM outbox WHERE delivered_at < ? '
+                    'OR failed_at < ?', (before, before))
+
+    def mark_failed(self, message_ids):
+        """Отмечает сообщения, которые не удалось доставить за все попытки."""
+        now = self.clock()
+        for message_id in message_ids:
+            self._write('UPDATE outbox SET failed_at = ? WHERE id = ?',
+                        (now, message_id))
+
+
+class SqliteTenantRegistry(TenantRegistry):
+    """Реестр подписок поверх SqliteStore."""
+
+    def __init__(self, store):
+        super().__init__(store.load_tenants())
+        self.store = store
+
+    @classmethod
+    def sync(cls, store, tenants):
+        """Сверяет базу с файлом подписок tenants и возвращает реестр базы.
+
+        Подписки из файла, которых в нём больше нет, снимаются, даже
+        если файл правили, пока бот не работал. Подписки, оформленные
+        командой /start, файл не затрагивает.
+        """
+        keys = {tenant.key for tenant in tenants}
+        removed = [tenant for tenant in store.load_tenants(SOURCE_FILE)
+                   if tenant.key not in keys]
+        for tenant in removed:
+            store.remove_tenant(tenant)
+        for tenant in tenants:
+            store.add_tenant(tenant, SOURCE_FILE)
+        store.commit()
+        if removed:
+            logging.info('Сняты подписки, удалённые из файла: %s',
+                         len(removed))
+        return cls(store)
+
+    def add(self, tenant):
+        """Добавляет подписку и сразу сохраняет её в базе."""
+        added = super().add(tenant)
+        if added:
+            self.store.add_tenant(tenant)
+            self.store.commit()
+        return added
+
+    def remove(self, tenant):
+        """Удаляет подписку и сразу удаляет её из базы."""
+        removed = super().remove(tenant)
+        if removed:
+            self.store.remove_tenant(tenant)
+            self.store.commit()
+        return removed
+
+    def remove_chat(self, chat_id):
+        """Снимает подписки чата и сразу удаляет их из базы."""
+        removed = super().remove_chat(chat_id)
+        for tenant in removed:
+            self.store.remove_tenant(tenant)
+        self.store.commit()
+        return removed
+
+    def apply(self, added, removed):
+        """Применяет правки файла подписок и сохраняет их в базе."""
+        super().apply(added, removed)
+        for tenant in removed:
+            self.store.remove_tenant(tenant)
+        for tenant in added:
+            self.store.add_tenant(tenant, SOURCE_FILE)
+        self.store.commit()
+
+
+class SqliteCursorStore(CursorStore):
+    """Курсоры from_date токенов поверх SqliteStore."""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        self._cursors = store.load_cursors()
+
+    def advance(self, key, from_date):
+        """Сдвигает курсор и пишет его в базу, если он вырос."""
+        if from_date > self._cursors.get(key, 0):
+            self.store.advance(key, from_date)
+        super().advance(key, from_date)
+
+    def flush(self):
+        """Сохраняет курсоры одной транзакцией."""
+        self.store.commit()
@@ -0,0 +1,121 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+# Сколько уже разобранного текста держим в буфере перед сжатием.
+COMPACT_AFTER = 64 * 1024
+
+
+class HomeworkStreamParser:
+    """Потоковый разбор ответа homework_statuses.
+
+    Ответ читается кусками, работы из списка homeworks отдаются по
+    одной, сам ответ целиком в памяти не собирается. Проверки те же,
+    что у check_response: ответ — словарь, ключ homeworks есть и под
+    ним список.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks.__aiter__()
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        self.current_date = None
+
+    async def _fill(self):
+        if self._eof:
+            return False
+        if self._position > COMPACT_AFTER:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._buffer += self._decoder.decode(b'', final=True)
+            self._eof = True
+            return False
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    async def _peek(self):
+        """Первый непробельный символ или '' в конце потока."""
+        while True:
+            buffer = self._buffer
+            while (self._position < len(buffer)
+                   and buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(buffer):
+                return buffer[self._position]
+            if not await self._fill():
+                return ''
+
+    async def _expect(self, expected):
+        char = await self._peek()
+        if not char or char not in expected:
+            raise json.JSONDecodeError(
+                f'Ожидался один из символов {expected!r}',
+                self._buffer, self._position)
+        self._position += 1
+        return char
+
+    async def _value(self):
+        """Разбирает одно JSON-значение, подчитывая поток по мере нужды."""
+        await self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(
+                    self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not await self._fill():
+                    raise
+                continue
+            # Число на краю буфера могло оборваться посередине.
+            if end == len(self._buffer) and await self._fill():
+                continue
+            self._position = end
+            return value
+
+    async def homeworks(self):
+        """Отдаёт работы по одной, проверяя структуру ответа."""
+        if await self._peek() != '{':
+            # Не словарь: дочитываем значение, чтобы отличить от не-JSON.
+            await self._value()
+            raise TypeError('API передал не словарь')
+        self._position += 1
+        seen_homeworks = False
+        if await self._peek() == '}':
+            self._position += 1
+        else:
+            while True:
+                key = await self._value()
+                await self._expect(':')
+                if key == 'homeworks':
+                    seen_homeworks = True
+                    async for homework in self._homeworks_value():
+                        yield homework
+                else:
+                    value = await self._value()
+                    if key == 'current_date':
+                        self.current_date = value
+                if await self._expect(',}') == '}':
+                    break
+        if not seen_homeworks:
+            raise TypeError('Ошибка ключа homeworks или response')
+
+    async def _homeworks_value(self):
+        char = await self._peek()
+        if char != '[':
+            value = await self._value()
+            if value is None:
+                raise TypeError('Ошибка ключа homeworks или response')
+            raise TypeError('Содержимое не список')
+        self._position += 1
+        if await self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            yield await self._value()
+            if await self._expect(',]') == ']':
+                return
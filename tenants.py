@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from exceptions import TenantConfigError
+from fileutils import write_json_atomic
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Подписка: токен ЯндексПрактикума и чат, куда слать статусы."""
+
+    practicum_token: str
+    chat_id: str
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API от имени ученика."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+    @property
+    def key(self):
+        """Уникальный ключ подписки."""
+        return self.practicum_token, str(self.chat_id)
+
+    @property
+    def token_id(self):
+        """Обезличенный идентификатор токена: курсор и расписание опроса."""
+        return hashlib.sha256(
+            self.practicum_token.encode()).hexdigest()[:16]
+
+    @property
+    def id(self):
+        """Обезличенный идентификатор подписки для файлов состояния."""
+        return hashlib.sha256(
+            f'{self.practicum_token}:{self.chat_id}'.encode()
+        ).hexdigest()[:16]
+
+
+def parse_tenants(records):
+    """Собирает подписки из списка словарей, отбрасывая дубли."""
+    if not isinstance(records, list):
+        raise TenantConfigError('Реестр подписок должен быть списком')
+    tenants = {}
+    for record in records:
+        if not isinstance(record, dict):
+            raise TenantConfigError(f'Некорректная подписка: {record!r}')
+        token = record.get('practicum_token')
+        chat_id = record.get('chat_id')
+        if not token or not chat_id:
+            raise TenantConfigError(
+                f'В подписке нет practicum_token или chat_id: {record!r}')
+        tenant = Tenant(token, str(chat_id))
+        tenants[tenant.key] = tenant
+    return list(tenants.values())
+
+
+def load_tenants(path):
+    """Читает реестр подписок из JSON-файла."""
+    try:
+        with open(path, encoding='utf-8') as registry:
+            records = json.load(registry)
+    except (OSError, json.JSONDecodeError) as error:
+        raise TenantConfigError(
+            f'Не удалось прочитать реестр подписок {path}: {error}')
+    return parse_tenants(records)
+
+
+class TenantRegistry:
+    """Изменяемый реестр подписок с сохранением в JSON-файл."""
+
+    def __init__(self, tenants=(), path=None):
+        self.path = path
+        self._tenants = {tenant.key: tenant for tenant in tenants}
+
+    @classmethod
+    def load(cls, path):
+        """Читает реестр из файла; отсутствующий файл — пустой реестр."""
+        try:
+            tenants = load_tenants(path)
+        except TenantConfigError:
+            if os.path.exists(path):
+                raise
+            tenants = []
+        return cls(tenants, path)
+
+    def __iter__(self):
+        return iter(list(self._tenants.values()))
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def for_chat(self, chat_id):
+        """Подписки указанного чата."""
+        return [tenant for tenant in self._tenants.values()
+                if tenant.chat_id == str(chat_id)]
+
+    def add(self, tenant):
+        """Добавляет подписку; False, если она уже есть."""
+        if tenant.key in self._tenants:
+            return False
+        self._tenants[tenant.key] = tenant
+        self.save()
+        return True
+
+    def remove(self, tenant):
+        """Удаляет подписку; False, если её не было."""
+        if self._tenants.pop(tenant.key, None) is None:
+            return False
+        self.save()
+        return True
+
+    def remove_chat(self, chat_id):
+        """Удаляет все подписки чата и возвращает их."""
+        removed = self.for_chat(chat_id)
+        for tenant in removed:
+            del self._tenants[tenant.key]
+        if removed:
+            self.save()
+        return removed
+
+    def apply(self, added, removed):
+        """Вносит правки, уже сделанные в файле реестра, не переписывая его."""
+        for tenant in removed:
+            self._tenants.pop(tenant.key, None)
+        for tenant in added:
+            self._tenants.setdefault(tenant.key, tenant)
+
+    def save(self):
+        """Сохраняет реестр, если он связан с файлом."""
+        if self.path is None:
+            return
+        write_json_atomic(self.path, [
+            {'practicum_token': tenant.practicum_token,
+             'chat_id': tenant.chat_id}
+            for tenant in self._tenants.values()
+        ])
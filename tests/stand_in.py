@@ -0,0 +1,83 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class FakeClock:
+
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StandIn:
+    """Локальная подмена API Практикума и Bot API Телеграма."""
+
+    def __init__(self, practicum=None, telegram=None):
+        self.practicum = practicum
+        self.telegram = telegram
+        self.calls = []
+        self.sent = []
+        self.server = None
+
+    async def _homework_statuses(self, request):
+        self.calls.append(request.headers['Authorization'])
+        status, data = self.practicum(request)
+        return web.json_response(data, status=status)
+
+    async def _send_message(self, request):
+        payload = await request.json()
+        if self.telegram is not None:
+            status, data = self.telegram(payload)
+            if not data.get('ok'):
+                return web.json_response(data, status=status)
+        self.sent.append((payload['chat_id'], payload['text']))
+        return web.json_response({'ok': True})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/practicum/', self._homework_statuses)
+        app.router.add_post('/bot{token}/sendMessage', self._send_message)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+    def patch(self, monkeypatch):
+        import homework
+
+        base = f'http://{self.server.host}:{self.server.port}'
+        monkeypatch.setattr(homework, 'ENDPOINT', f'{base}/practicum/')
+        monkeypatch.setattr(
+            homework, 'TELEGRAM_API', base + '/bot{token}/{method}')
+
+
+def run_engine(monkeypatch, practicum, tenants, rounds, **kwargs):
+    from engine import PollingEngine
+    from scheduling import FixedPolicy
+
+    clock = FakeClock()
+    kwargs.setdefault('policy', FixedPolicy(600))
+
+    async def scenario():
+        async with StandIn(practicum) as stand_in:
+            stand_in.patch(monkeypatch)
+            async with aiohttp.ClientSession() as session:
+                engine = PollingEngine(
+                    session, 'token', tenants, retry_time=600,
+                    clock=clock, **kwargs)
+                for _ in range(rounds):
+                    clock.sleep(engine.run_pending())
+                    await engine.drain()
+            return stand_in
+
+    return asyncio.run(scenario()), clock
@@ -0,0 +1,108 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from stand_in import FakeClock, run_engine
+
+
+class TestCircuitBreaker:
+
+    def make(self, **kwargs):
+        from circuit_breaker import CircuitBreaker
+
+        clock = FakeClock()
+        kwargs.setdefault('failure_threshold', 2)
+        kwargs.setdefault('reset_timeout', 10)
+        return CircuitBreaker('test', clock=clock, **kwargs), clock
+
+    def test_opens_after_threshold(self):
+        from circuit_breaker import CLOSED, OPEN
+
+        breaker, _ = self.make()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN, (
+            'Предохранитель размыкается после серии сбоев'
+        )
+        assert not breaker.allow()
+        assert breaker.retry_after() == 10
+
+    def test_single_probe_closes(self):
+        from circuit_breaker import CLOSED, HALF_OPEN
+
+        breaker, clock = self.make()
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.sleep(10)
+        assert breaker.allow(), 'После паузы разрешается пробный вызов'
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(), 'Пробный вызов должен быть один'
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_doubles_timeout(self):
+        from circuit_breaker import OPEN
+
+        breaker, clock = self.make()
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.sleep(10)
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == 20, (
+            'Неудачная проба должна удваивать паузу'
+        )
+
+    def test_tenant_errors_do_not_open(self):
+        from circuit_breaker import CLOSED
+        from exceptions import NotStatusOkException
+
+        breaker, _ = self.make()
+
+        async def unauthorized():
+            raise NotStatusOkException('401', status=HTTPStatus.UNAUTHORIZED)
+
+        for _ in range(3):
+            with pytest.raises(NotStatusOkException):
+                asyncio.run(breaker.call(unauthorized))
+        assert breaker.state == CLOSED, (
+            'Ошибки одной подписки не должны размыкать предохранитель'
+        )
+
+    def test_call_rejected_when_open(self):
+        from exceptions import CircuitOpenError
+
+        breaker, _ = self.make()
+        breaker.record_failure()
+        breaker.record_failure()
+
+        async def never():
+            raise AssertionError('Вызов не должен выполняться')
+
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(breaker.call(never))
+
+
+class TestEngineCircuitBreaker:
+
+    def test_outage_is_not_multiplied_by_tenants(self, monkeypatch):
+        from circuit_breaker import CircuitBreaker
+        from tenants import Tenant
+
+        def practicum(request):
+            return HTTPStatus.BAD_GATEWAY, {}
+
+        tenants = [Tenant(f'token-{i}', i) for i in range(10)]
+        breaker = CircuitBreaker(
+            'practicum', failure_threshold=3, reset_timeout=10_000)
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, tenants, rounds=700, breaker=breaker)
+        assert len(stand_in.calls) == 3, (
+            'После размыкания запросы к API не должны уходить'
+        )
+        assert len(stand_in.sent) == 3, (
+            'Об общем сбое пишем только тем, чей запрос упал'
+        )
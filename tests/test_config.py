@@ -0,0 +1,65 @@
+import dataclasses
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+class TestConfig:
+
+    def test_from_env(self):
+        from config import Config
+
+        config = Config.from_env({
+            'PRACTICUM_TOKEN': 'p', 'TELEGRAM_TOKEN': 't',
+            'TELEGRAM_CHAT_ID': '1', 'SHARDS': '4', 'HTTP_POOL_SIZE': '10',
+            'LOG_JSON': 'true',
+        })
+        assert config.check_tokens()
+        assert config.shards == 4
+        assert config.log_json and not config.log_async
+        assert config.pool_options['pool_size'] == 10
+        assert config.cursors_file == 'cursors.json'
+
+    def test_is_immutable(self):
+        from config import Config
+
+        config = Config.from_env({})
+        assert not config.check_tokens()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.telegram_token = 't'
+
+    def test_import_is_light(self):
+        code = (
+            'import sys, homework; '
+            'print(sorted(m for m in ("requests", "aiohttp", "dotenv", '
+            '"telegram") if m in sys.modules))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True).stdout
+        assert output.strip() == '[]', (
+            'Тяжёлые клиенты должны импортироваться при первом использовании'
+        )
+
+    def test_sync_api_reads_dotenv(self, tmp_path):
+        (tmp_path / '.env').write_text(
+            'PRACTICUM_TOKEN=p\nTELEGRAM_TOKEN=t\nTELEGRAM_CHAT_ID=1\n')
+        environ = {
+            name: value for name, value in os.environ.items()
+            if name not in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
+                            'TELEGRAM_CHAT_ID')
+        }
+        environ['PYTHONPATH'] = os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))
+        code = (
+            'import homework; '
+            'print(homework.PRACTICUM_TOKEN, homework.check_tokens())'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True, cwd=tmp_path, env=environ).stdout
+        assert output.split() == ['p', 'True'], (
+            'Токены синхронного API должны читаться и из .env'
+        )
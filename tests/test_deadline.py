@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from stand_in import FakeClock
+
+
+class TestDeadline:
+
+    def test_timeouts_fit_remaining_budget(self):
+        from deadline import Deadline
+
+        clock = FakeClock()
+        deadline = Deadline(8, clock=clock)
+        assert deadline.requests_timeout(connect=5, read=20) == (5, 8)
+        clock.sleep(6)
+        timeout = deadline.client_timeout(connect=5, read=20)
+        assert (timeout.total, timeout.connect, timeout.sock_read) == (
+            2, 2, 2), 'Таймауты не должны выходить за остаток бюджета'
+
+    def test_expired_deadline_raises(self):
+        from deadline import Deadline
+
+        clock = FakeClock()
+        deadline = Deadline(1, clock=clock)
+        clock.sleep(1)
+        with pytest.raises(asyncio.TimeoutError):
+            deadline.client_timeout()
+
+    def test_sync_request_has_timeout(self, monkeypatch):
+        import homework
+
+        seen = {}
+
+        def get(*args, **kwargs):
+            seen.update(kwargs)
+            raise requests.exceptions.ReadTimeout()
+
+        monkeypatch.setattr(requests, 'get', get)
+        with pytest.raises(TimeoutError):
+            homework.get_api_answer(0)
+        assert seen.get('timeout'), (
+            'Запрос к API должен уходить с таймаутом'
+        )
+
+    def test_stalled_upstream_is_cut_off(self, monkeypatch):
+        import homework
+        from deadline import Deadline
+        from metrics import UPSTREAM_TIMEOUTS
+
+        async def stall(request):
+            await asyncio.sleep(1)
+            return web.json_response({})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get('/practicum/', stall)
+            server = TestServer(app)
+            await server.start_server()
+            monkeypatch.setattr(
+                homework, 'ENDPOINT',
+                f'http://{server.host}:{server.port}/practicum/')
+            try:
+                async with aiohttp.ClientSession() as session:
+                    started = time.monotonic()
+                    with pytest.raises(asyncio.TimeoutError):
+                        await homework.get_homework_statuses_async(
+                            session, {}, 0, deadline=Deadline(0.2))
+                    return time.monotonic() - started
+            finally:
+                await server.close()
+
+        before = UPSTREAM_TIMEOUTS.labels('practicum').value()
+        assert asyncio.run(scenario()) < 0.9, (
+            'Зависший запрос должен обрываться по сроку'
+        )
+        assert UPSTREAM_TIMEOUTS.labels('practicum').value() == before + 1
@@ -0,0 +1,87 @@
+import asyncio
+from http import HTTPStatus
+
+import aiohttp
+from stand_in import FakeClock, StandIn
+
+
+def deliver(monkeypatch, messages, rounds=1, telegram=None, **kwargs):
+    from delivery import DeliveryQueue
+
+    clock = FakeClock()
+
+    async def scenario():
+        async with StandIn(telegram=telegram) as stand_in:
+            stand_in.patch(monkeypatch)
+            async with aiohttp.ClientSession() as session:
+                queue = DeliveryQueue(
+                    session, 'token', clock=clock, **kwargs)
+                for chat_id, text in messages:
+                    queue.enqueue(chat_id, text)
+                for _ in range(rounds):
+                    await queue.drain()
+                    clock.sleep(1)
+            return stand_in, queue
+
+    return asyncio.run(scenario())
+
+
+class TestDeliveryQueue:
+
+    def test_messages_to_one_chat_are_coalesced(self, monkeypatch):
+        stand_in, queue = deliver(
+            monkeypatch, [('1', 'a'), ('1', 'b'), ('2', 'c')])
+        assert sorted(stand_in.sent) == [('1', 'a\n\nb'), ('2', 'c')], (
+            'Сообщения в один чат должны уходить одним сообщением'
+        )
+        assert len(queue) == 0
+
+    def test_coalesce_respects_message_limit(self):
+        from delivery import coalesce
+
+        message, rest = coalesce(['a' * 3, 'b' * 3, 'c'], limit=8)
+        assert message == 'aaa\n\nbbb'
+        assert rest == ['c']
+
+    def test_global_rate_limit(self, monkeypatch):
+        stand_in, _ = deliver(
+            monkeypatch, [('1', 'a'), ('2', 'b')], rounds=3,
+            global_rate=1)
+        assert [chat_id for chat_id, _ in stand_in.sent] == ['1', '2'], (
+            'Общий лимит должен растягивать отправку по времени'
+        )
+
+    def test_failed_send_is_retried(self, monkeypatch):
+        failures = iter([True, True])
+
+        def telegram(payload):
+            if next(failures, False):
+                return HTTPStatus.TOO_MANY_REQUESTS, {'ok': False}
+            return HTTPStatus.OK, {'ok': True}
+
+        stand_in, queue = deliver(
+            monkeypatch, [('1', 'a')], rounds=10, telegram=telegram)
+        assert stand_in.sent == [('1', 'a')], (
+            'Неудачная отправка должна повторяться с backoff'
+        )
+        assert len(queue) == 0
+
+    def test_dropped_message_is_not_resent(self, monkeypatch, tmp_path):
+        from store import SqliteStore
+
+        store = SqliteStore(str(tmp_path / 'bot.sqlite3'))
+        store.enqueue_message('1', 'a', key='a')
+        store.commit()
+
+        def telegram(payload):
+            return HTTPStatus.BAD_REQUEST, {'ok': False}
+
+        deliver(monkeypatch, [], rounds=5, telegram=telegram, outbox=store,
+                max_attempts=2, backoff=0)
+        store.commit()
+        assert store.pending_messages() == [], (
+            'Сообщение, отброшенное после всех попыток, не должно '
+            'отправляться снова после перезапуска'
+        )
+        assert store._db.execute(
+            'SELECT failed_at IS NOT NULL FROM outbox').fetchone() == (1,)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from stand_in import FakeClock
+
+
+class MockDelivery:
+
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def make_dispatcher(tmp_path, tenants=()):
+    from dispatcher import UpdateDispatcher
+    from engine import PollingEngine
+    from tenants import TenantRegistry
+
+    registry = TenantRegistry(tenants, tmp_path / 'tenants.json')
+    delivery = MockDelivery()
+
+    async def build():
+        engine = PollingEngine(
+            None, 'token', registry, delivery=delivery, clock=FakeClock())
+        return UpdateDispatcher(None, 'token', engine, registry)
+
+    return asyncio.run(build()), delivery
+
+
+def update(chat_id, text):
+    return {'update_id': 1,
+            'message': {'chat': {'id': chat_id}, 'text': text}}
+
+
+class TestUpdateDispatcher:
+
+    def test_start_and_stop(self, tmp_path):
+        dispatcher, delivery = make_dispatcher(tmp_path)
+        dispatcher.handle(update(1, '/start secret'))
+        assert [t.key for t in dispatcher.registry] == [('secret', '1')]
+        assert json.loads((tmp_path / 'tenants.json').read_text()) == [
+            {'practicum_token': 'secret', 'chat_id': '1'}], (
+            'Новая подписка должна сохраняться в реестр'
+        )
+        assert dispatcher.engine.add_tenant(
+            dispatcher.registry.for_chat(1)[0]) is False, (
+            'После /start подписка должна стоять в расписании опроса'
+        )
+        dispatcher.handle(update(1, '/stop'))
+        assert len(dispatcher.registry) == 0
+        assert [chat_id for chat_id, _ in delivery.sent] == ['1', '1']
+
+    def test_status_is_served_from_cache(self, tmp_path):
+        from models import Homework, Status
+        from tenants import Tenant
+
+        tenant = Tenant('secret', '1')
+        dispatcher, delivery = make_dispatcher(tmp_path, [tenant])
+        dispatcher.engine.states.remember(
+            (tenant.key, 42), Homework(42, 'hw05', Status.APPROVED))
+        dispatcher.handle(update(1, '/status@homework_bot'))
+        assert delivery.sent == [
+            ('1', '"hw05": Работа проверена: ревьюеру всё понравилось. Ура!')
+        ]
+
+    def test_subscriptions_per_chat_are_capped(self, tmp_path):
+        from dispatcher import MAX_CHAT_SUBSCRIPTIONS
+
+        dispatcher, delivery = make_dispatcher(tmp_path)
+        for number in range(MAX_CHAT_SUBSCRIPTIONS + 3):
+            dispatcher.handle(update(1, f'/start token-{number}'))
+        assert len(dispatcher.registry) == MAX_CHAT_SUBSCRIPTIONS, (
+            'Один чат не может оформить подписок больше предела'
+        )
+        assert len(dispatcher.engine) == MAX_CHAT_SUBSCRIPTIONS
+        assert delivery.sent[-1][1].startswith('Не больше')
+
+    def test_unknown_command_gets_help(self, tmp_path):
+        from dispatcher import HELP
+
+        dispatcher, delivery = make_dispatcher(tmp_path)
+        dispatcher.handle(update(1, '/hello'))
+        dispatcher.handle(update(1, 'просто текст'))
+        assert delivery.sent == [('1', HELP)]
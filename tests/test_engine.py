@@ -0,0 +1,223 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from stand_in import FakeClock, run_engine
+
+
+class TestTenants:
+
+    def test_load_tenants(self, tmp_path):
+        from tenants import load_tenants
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'a', 'chat_id': '1'},
+            {'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        tenants = load_tenants(path)
+        assert [tenant.key for tenant in tenants] == [('a', '1'), ('b', '2')]
+        assert tenants[0].headers == {'Authorization': 'OAuth a'}
+
+    def test_load_tenants_invalid(self, tmp_path):
+        from exceptions import TenantConfigError
+        from tenants import load_tenants
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'chat_id': 1}]))
+        with pytest.raises(TenantConfigError):
+            load_tenants(path)
+
+
+class TestPollingEngine:
+
+    def test_polls_every_tenant(self, monkeypatch):
+        from tenants import Tenant
+
+        def practicum(request):
+            return HTTPStatus.OK, {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': int(request.query['from_date']),
+            }
+
+        tenants = [Tenant('a', '1'), Tenant('b', '2')]
+        stand_in, _ = run_engine(monkeypatch, practicum, tenants, rounds=302)
+        assert stand_in.calls == ['OAuth a', 'OAuth b'], (
+            'Первые опросы подписок должны быть разнесены по интервалу'
+        )
+        assert [chat_id for chat_id, _ in stand_in.sent] == ['1', '2']
+
+    def test_one_poll_per_token(self, monkeypatch):
+        from tenants import Tenant
+
+        def practicum(request):
+            return HTTPStatus.OK, {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': int(request.query['from_date']) + 1,
+            }
+
+        tenants = [Tenant('secret', '1'), Tenant('secret', '2'),
+                   Tenant('other', '3')]
+        stand_in, _ = run_engine(monkeypatch, practicum, tenants, rounds=3000)
+        assert stand_in.calls.count('OAuth secret') == 5, (
+            'Ментор и ученик с одним токеном должны опрашиваться одним '
+            'запросом по общему расписанию'
+        )
+        assert sorted(chat_id for chat_id, _ in stand_in.sent) == [
+            '1', '2', '3'], 'Ответ токена разбирается для каждой подписки'
+
+    def test_removed_subscriber_keeps_token_polled(self, monkeypatch):
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        mentor, student = Tenant('secret', '1'), Tenant('secret', '2')
+        engine = PollingEngine(None, 'token', [mentor, student],
+                               clock=FakeClock())
+        engine.remove_tenant(mentor)
+        assert len(engine) == 1
+        assert engine.next_poll_at() is not None, (
+            'Токен опрашивается, пока у него есть подписки'
+        )
+        engine.remove_tenant(student)
+        engine.run_pending()
+        assert not engine._tasks, 'Снятый токен больше не опрашивается'
+
+    def test_error_does_not_stop_other_tenants(self, monkeypatch):
+        from tenants import Tenant
+
+        def practicum(request):
+            if request.headers['Authorization'] == 'OAuth bad':
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}
+            return HTTPStatus.OK, {'homeworks': [], 'current_date': 1}
+
+        tenants = [Tenant('bad', '1'), Tenant('good', '2')]
+        stand_in, _ = run_engine(monkeypatch, practicum, tenants, rounds=1300)
+        assert stand_in.calls.count('OAuth bad') == 3
+        assert stand_in.calls.count('OAuth good') == 2
+        assert stand_in.sent == [('1', 'Сбой в работе программы: '
+                                       'Недоступность эндпоинта')], (
+            'Ошибка одной подписки должна уходить только ей и один раз'
+        )
+
+    def test_rejected_token_is_dropped(self, monkeypatch):
+        from engine import REJECTED_MESSAGE
+        from tenants import Tenant
+
+        def practicum(request):
+            if request.headers['Authorization'] == 'OAuth bad':
+                return HTTPStatus.UNAUTHORIZED, {}
+            return HTTPStatus.OK, {'homeworks': [], 'current_date': 1}
+
+        rejected = []
+        tenants = [Tenant('bad', '1'), Tenant('bad', '2'), Tenant('good', '3')]
+        stand_in, _ = run_engine(monkeypatch, practicum, tenants, rounds=1300,
+                                 on_rejected=rejected.append)
+        assert stand_in.calls.count('OAuth bad') == 1, (
+            'Токен, который API не принял, больше не опрашивается'
+        )
+        assert stand_in.calls.count('OAuth good') == 2
+        assert rejected == tenants[:2]
+        assert stand_in.sent == [('1', REJECTED_MESSAGE),
+                                 ('2', REJECTED_MESSAGE)]
+
+    def test_cursor_follows_current_date(self, monkeypatch, tmp_path):
+        from cursors import CursorStore
+        from tenants import Tenant
+
+        requested = []
+
+        def practicum(request):
+            from_date = int(request.query['from_date'])
+            requested.append(from_date)
+            return HTTPStatus.OK, {'homeworks': [],
+                                   'current_date': from_date + 100}
+
+        path = tmp_path / 'cursors.json'
+        tenant = Tenant('a', '1')
+        cursors = CursorStore(path)
+        run_engine(monkeypatch, practicum, [tenant], rounds=602,
+                   cursors=cursors)
+        assert requested == [1000, 1100], (
+            'from_date должен сдвигаться по current_date из ответа API'
+        )
+        cursors.flush()
+        assert CursorStore(path).get(tenant.token_id) == 1200, (
+            'После перезапуска опрос должен продолжиться '
+            'с сохранённого курсора'
+        )
+
+    def test_only_transitions_are_sent(self, monkeypatch):
+        from tenants import Tenant
+
+        statuses = iter([
+            [('hw1', 'reviewing'), ('hw2', 'reviewing')],
+            [('hw1', 'reviewing'), ('hw2', 'approved')],
+        ])
+
+        def practicum(request):
+            homeworks = [{'id': name, 'homework_name': name, 'status': status}
+                         for name, status in next(statuses)]
+            return HTTPStatus.OK, {'homeworks': homeworks, 'current_date': 1}
+
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, [Tenant('a', '1')], rounds=602)
+        assert [text.split('"')[1::2] for _, text in stand_in.sent] == [
+            ['hw1', 'hw2'], ['hw2']], (
+            'Сообщение должно уходить по каждой работе '
+            'и только при смене статуса'
+        )
+
+
+class TestHomeworkStateCache:
+
+    def test_lru_eviction(self):
+        from models import Homework, Status
+        from state_cache import HomeworkStateCache
+
+        cache = HomeworkStateCache(max_size=2)
+        for name, status in [('a', Status.REVIEWING), ('b', Status.REVIEWING),
+                             ('c', Status.APPROVED)]:
+            cache.remember(('t', name), Homework(name, name, status))
+        assert len(cache) == 2
+        assert cache.get(('t', 'a')) is None
+        assert cache.get(('t', 'c')).status == Status.APPROVED
+        assert cache.statuses('t') == {
+            'b': Status.REVIEWING, 'c': Status.APPROVED}
+
+    def test_ttl_eviction(self):
+        from models import Homework, Status
+        from state_cache import HomeworkStateCache
+
+        clock = FakeClock()
+        cache = HomeworkStateCache(ttl=10, clock=clock)
+        cache.remember(('t', 1), Homework(1, 'a', Status.REVIEWING))
+        clock.sleep(11)
+        assert cache.get(('t', 1)) is None
+        cache.remember(('t', 2), Homework(2, 'hw', Status.APPROVED))
+        assert len(cache) == 1
+        assert cache.statuses('t') == {'hw': Status.APPROVED}
+
+
+class TestCursorStore:
+
+    def test_cursor_never_moves_back(self):
+        from cursors import CursorStore
+
+        cursors = CursorStore()
+        cursors.advance('a', 10)
+        cursors.advance('a', 5)
+        assert cursors.get('a') == 10
+
+    def test_flush_is_atomic(self, tmp_path):
+        from cursors import CursorStore
+
+        path = tmp_path / 'cursors.json'
+        cursors = CursorStore(path)
+        cursors.advance('a', 10)
+        cursors.flush()
+        assert json.loads(path.read_text()) == {'a': 10}
+        assert [p.name for p in tmp_path.iterdir()] == ['cursors.json'], (
+            'Временный файл курсоров не должен оставаться на диске'
+        )
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from stand_in import FakeClock, run_engine
+
+
+class TestErrorDeduplicator:
+
+    def make(self, path=None):
+        from error_dedup import ErrorDeduplicator
+
+        clock = FakeClock()
+        return ErrorDeduplicator(path, window=100, clock=clock), clock
+
+    def test_fingerprint_ignores_numbers(self):
+        from error_dedup import fingerprint
+
+        assert (fingerprint(ConnectionError('порт 8080, попытка 1'))
+                == fingerprint(ConnectionError('порт 9090, попытка 2'))), (
+            'Сбои, отличающиеся только числами, — один и тот же сбой'
+        )
+        assert fingerprint(ValueError('x')) != fingerprint(TypeError('x'))
+
+    def test_one_notification_per_chat_per_window(self):
+        from tenants import Tenant
+
+        errors, clock = self.make()
+        first, second = Tenant('a', '1'), Tenant('b', '1')
+        error = ConnectionError('Сбой при запросе к эндпоинту')
+        assert errors.record_failure(first, error)
+        assert not errors.record_failure(second, error), (
+            'Один сбой на две подписки чата — одно сообщение'
+        )
+        clock.sleep(50)
+        assert not errors.record_failure(first, error)
+        clock.sleep(50)
+        assert errors.record_failure(first, error), (
+            'Через окно о незакрытом сбое напоминаем'
+        )
+
+    def test_recovery_after_all_tenants_recover(self):
+        from tenants import Tenant
+
+        errors, _ = self.make()
+        first, second = Tenant('a', '1'), Tenant('b', '1')
+        error = ConnectionError('Сбой при запросе к эндпоинту')
+        errors.record_failure(first, error)
+        errors.record_failure(second, error)
+        assert not errors.record_success(first), (
+            'Пока вторая подписка падает, сбой не закончился'
+        )
+        assert errors.record_success(second)
+        assert not errors.record_success(second)
+
+    def test_state_survives_restart(self, tmp_path):
+        from tenants import Tenant
+
+        path = tmp_path / 'errors.json'
+        errors, _ = self.make(path)
+        tenant = Tenant('a', '1')
+        error = ConnectionError('Сбой при запросе к эндпоинту')
+        errors.record_failure(tenant, error)
+        errors.flush()
+        restarted, _ = self.make(path)
+        assert not restarted.record_failure(tenant, error), (
+            'После перезапуска о том же сбое повторно не пишем'
+        )
+        assert restarted.record_success(tenant), (
+            'После перезапуска восстановление всё равно сообщается'
+        )
+
+
+class TestEngineErrorDedup:
+
+    def test_recovery_message(self, monkeypatch):
+        from error_dedup import RECOVERY_MESSAGE
+        from tenants import Tenant
+
+        answers = iter([HTTPStatus.BAD_GATEWAY, HTTPStatus.BAD_GATEWAY])
+
+        def practicum(request):
+            status = next(answers, HTTPStatus.OK)
+            return status, {'homeworks': []}
+
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, [Tenant('a', '1')], rounds=1900)
+        assert [text for _, text in stand_in.sent] == [
+            'Сбой в работе программы: Недоступность эндпоинта',
+            RECOVERY_MESSAGE,
+        ], 'После сбоя подписчик получает одно сообщение о восстановлении'
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import aiohttp
+from stand_in import FakeClock, StandIn
+
+
+def write_tenants(path, *tokens):
+    path.write_text(json.dumps([
+        {'practicum_token': token, 'chat_id': f'chat-{token}'}
+        for token in tokens
+    ]))
+
+
+class TestTenantReloader:
+
+    def make(self, tmp_path):
+        from engine import PollingEngine
+        from hot_reload import TenantReloader
+        from tenants import TenantRegistry
+
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, 'a', 'b')
+        registry = TenantRegistry.load(path)
+        engine = PollingEngine(None, 'token', registry, clock=FakeClock())
+        return path, registry, engine, TenantReloader(path, registry, engine)
+
+    def test_applies_only_the_difference(self, tmp_path):
+        path, registry, engine, reloader = self.make(tmp_path)
+        write_tenants(path, 'b', 'c', 'd')
+        content = path.read_text()
+        added, removed = reloader.reload()
+        assert sorted(t.practicum_token for t in added) == ['c', 'd']
+        assert [t.practicum_token for t in removed] == ['a']
+        assert sorted(t.practicum_token for t in registry) == [
+            'b', 'c', 'd']
+        assert len(engine) == 3, 'Движок опрашивает подписки из нового файла'
+        assert path.read_text() == content, (
+            'Перечитывание не должно переписывать файл подписок'
+        )
+        assert reloader.reload() == ([], []), (
+            'Повторное перечитывание без правок ничего не меняет'
+        )
+
+    def test_broken_file_keeps_tenants(self, tmp_path):
+        path, registry, engine, reloader = self.make(tmp_path)
+        path.write_text('{')
+        assert reloader.reload() == ([], [])
+        assert len(engine) == 2, 'Сломанный файл не снимает подписки'
+
+
+class TestGracefulShutdown:
+
+    def test_shutdown_finishes_polls_and_sends(self, monkeypatch, tmp_path):
+        from cursors import CursorStore
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        current_date = int(time.time()) + 1000
+
+        def practicum(request):
+            return HTTPStatus.OK, {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': current_date,
+            }
+
+        path = tmp_path / 'cursors.json'
+        tenants = [Tenant(token, '1') for token in 'abc']
+
+        async def scenario():
+            async with StandIn(practicum) as stand_in:
+                stand_in.patch(monkeypatch)
+                async with aiohttp.ClientSession() as session:
+                    engine = PollingEngine(
+                        session, 'token', tenants, retry_time=0,
+                        cursors=CursorStore(path))
+                    engine.run_pending()
+                    engine.stop()
+                    await engine.run_forever()
+                    await engine.shutdown()
+            return stand_in
+
+        stand_in = asyncio.run(scenario())
+        assert len(stand_in.calls) == 3
+        assert sum(text.count('"hw"') for _, text in stand_in.sent) == 3, (
+            'Начатые опросы доводятся, их уведомления отправляются'
+        )
+        cursors = CursorStore(path)
+        assert all(cursors.get(t.token_id) == current_date for t in tenants), (
+            'При остановке курсоры сохраняются на диск'
+        )
+
+    def test_main_returns_error_code(self, monkeypatch):
+        import config
+        import homework
+
+        monkeypatch.setattr(homework, 'configure_logging', lambda c: None)
+        monkeypatch.setattr(
+            config, 'load_config', lambda: config.Config.from_env({}))
+        assert homework.main() == 1, (
+            'Без токенов main() возвращает код ошибки, а не вызывает exit()'
+        )
@@ -0,0 +1,31 @@
+import asyncio
+from http import HTTPStatus
+
+from stand_in import StandIn
+
+
+class TestConnectionPool:
+
+    def test_connections_are_reused(self, monkeypatch):
+        from homework import get_homework_statuses_async
+        from http_pool import ConnectionStats, create_session
+
+        def practicum(request):
+            return HTTPStatus.OK, {'homeworks': [], 'current_date': 1}
+
+        async def scenario():
+            stats = ConnectionStats()
+            async with StandIn(practicum) as stand_in:
+                stand_in.patch(monkeypatch)
+                async with create_session(stats, pool_per_host=1) as session:
+                    for _ in range(5):
+                        await get_homework_statuses_async(
+                            session, {'Authorization': 'OAuth a'}, 0)
+            return stats
+
+        stats = asyncio.run(scenario())
+        assert stats.created == 1, (
+            'Повторные запросы к API должны идти по открытому соединению'
+        )
+        assert stats.reused == 4
+        assert stats.reuse_ratio == 0.8
@@ -0,0 +1,76 @@
+import io
+import json
+import logging
+
+from stand_in import FakeClock
+
+
+def make_record(msg, *args, level=logging.INFO, lineno=1):
+    return logging.LogRecord(
+        'root', level, 'homework.py', lineno, msg, args, None)
+
+
+class TestLogPipeline:
+
+    def test_sampling_keeps_errors(self):
+        from log_pipeline import SamplingFilter
+
+        clock = FakeClock()
+        sampling = SamplingFilter(2, window=60, clock=clock)
+        passed = [sampling.filter(make_record('Запрос %s', number))
+                  for number in range(5)]
+        assert passed == [True, True, False, False, False], (
+            'Повторы одной info-строки прореживаются независимо от аргументов'
+        )
+        assert all(
+            sampling.filter(make_record('Сбой', level=logging.ERROR))
+            for _ in range(5)), 'Ошибки никогда не отбрасываются'
+        clock.sleep(60)
+        record = make_record('Запрос %s', 6)
+        assert sampling.filter(record)
+        assert record.suppressed == 3, (
+            'Первая запись нового окна сообщает, сколько строк отброшено'
+        )
+
+    def test_json_record_carries_tenant(self):
+        from log_pipeline import TENANT, JsonFormatter, TenantFilter
+
+        token = TENANT.set('tenant-1')
+        try:
+            record = make_record('Ответ %s', 200, level=logging.ERROR)
+            TenantFilter().filter(record)
+        finally:
+            TENANT.reset(token)
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['message'] == 'Ответ 200'
+        assert entry['level'] == 'ERROR'
+        assert entry['tenant'] == 'tenant-1', (
+            'Запись лога должна нести id подписки'
+        )
+
+    def test_queue_mode(self):
+        from log_pipeline import setup_logging
+
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        stream = io.StringIO()
+        try:
+            listener = setup_logging(
+                json_format=True, use_queue=True, stream=stream)
+            logging.info('Отправляю запрос %s', 1)
+            try:
+                raise ValueError('сломалось')
+            except ValueError:
+                logging.exception('Сбой')
+            listener.stop()
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [entry['message'] for entry in entries] == [
+            'Отправляю запрос 1', 'Сбой'], (
+            'Записи из очереди пишутся фоновым потоком по порядку'
+        )
+        assert 'ValueError: сломалось' in entries[1]['exception'], (
+            'Трассировка исключения не должна теряться в очереди'
+        )
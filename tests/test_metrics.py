@@ -0,0 +1,72 @@
+import asyncio
+from http import HTTPStatus
+
+import aiohttp
+import pytest
+from stand_in import StandIn
+
+
+class TestMetrics:
+
+    def test_exposition_format(self):
+        from metrics import Registry
+
+        registry = Registry()
+        counter = registry.counter('requests_total', 'Запросы', ['outcome'])
+        histogram = registry.histogram(
+            'request_seconds', 'Длительность', buckets=(0.1, 1))
+        counter.labels(200).inc()
+        counter.labels(200).inc()
+        histogram.observe(0.5)
+        assert registry.expose() == (
+            '# HELP requests_total Запросы\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{outcome="200"} 2\n'
+            '# HELP request_seconds Длительность\n'
+            '# TYPE request_seconds histogram\n'
+            'request_seconds_bucket{le="0.1"} 0\n'
+            'request_seconds_bucket{le="1"} 1\n'
+            'request_seconds_bucket{le="+Inf"} 1\n'
+            'request_seconds_sum 0.5\n'
+            'request_seconds_count 1\n'
+        )
+
+    def test_validation_failures_are_counted(self):
+        import homework
+        from metrics import VALIDATION_FAILURES
+
+        before = VALIDATION_FAILURES.labels('parse_status').value()
+        with pytest.raises(KeyError):
+            homework.parse_status({'status': 'approved'})
+        assert VALIDATION_FAILURES.labels('parse_status').value() == (
+            before + 1)
+
+    def test_practicum_requests_by_outcome(self, monkeypatch):
+        from homework import get_homework_statuses_async
+        from metrics import PRACTICUM_REQUESTS, REGISTRY, start_metrics_server
+
+        def practicum(request):
+            return HTTPStatus.BAD_GATEWAY, {}
+
+        async def scenario():
+            async with StandIn(practicum) as stand_in:
+                stand_in.patch(monkeypatch)
+                async with aiohttp.ClientSession() as session:
+                    with pytest.raises(Exception):
+                        await get_homework_statuses_async(
+                            session, {'Authorization': 'OAuth a'}, 0)
+                    runner = await start_metrics_server(0)
+                    port = runner.addresses[0][1]
+                    async with session.get(
+                        f'http://127.0.0.1:{port}/metrics'
+                    ) as response:
+                        text = await response.text()
+                    await runner.cleanup()
+            return text
+
+        before = PRACTICUM_REQUESTS.labels(502).value()
+        text = asyncio.run(scenario())
+        assert PRACTICUM_REQUESTS.labels(502).value() == before + 1
+        assert f'practicum_requests_total{{outcome="502"}} {before + 1}' in (
+            text)
+        assert text == REGISTRY.expose()
@@ -0,0 +1,46 @@
+import pytest
+
+
+class TestHomeworkRecord:
+
+    @pytest.mark.parametrize('status', ['approved', 'reviewing', 'rejected'])
+    def test_message_format_is_unchanged(self, status):
+        from models import HOMEWORK_VERDICTS, Homework
+
+        homework = Homework.from_api(
+            {'id': 1, 'homework_name': 'hw05', 'status': status})
+        assert homework.message == (
+            f'Изменился статус проверки работы "hw05". '
+            f'{HOMEWORK_VERDICTS[status]}'
+        )
+
+    def test_record_is_compact(self):
+        from models import Homework, Status
+
+        homework = Homework(1, 'hw05', Status.APPROVED)
+        assert not hasattr(homework, '__dict__'), (
+            'Запись о работе должна храниться в __slots__'
+        )
+        assert homework.status == 1
+        assert homework.status.api_name == 'approved'
+
+    def test_id_falls_back_to_name(self):
+        from models import Homework
+
+        homework = Homework.from_api(
+            {'homework_name': 'hw05', 'status': 'reviewing'})
+        assert homework.id == 'hw05'
+
+    def test_unknown_status(self):
+        from models import Homework
+
+        with pytest.raises(KeyError):
+            Homework.from_api({'homework_name': 'hw05', 'status': 'unknown'})
+
+    def test_parse_status_accepts_record(self):
+        import homework
+        from models import Homework, Status
+
+        record = Homework(1, 'hw05', Status.REJECTED)
+        assert homework.parse_status(record) == homework.parse_status(
+            {'homework_name': 'hw05', 'status': 'rejected'})
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+
+class TestFairLimiter:
+
+    def grant_order(self, requests, **kwargs):
+        """Порядок, в котором лимитер выдал слоты запросам requests."""
+        from rate_limit import FairLimiter
+
+        kwargs.setdefault('rate', 500)
+        kwargs.setdefault('burst', 1)
+        kwargs.setdefault('token_rate', 1000)
+        kwargs.setdefault('token_burst', 1000)
+        order = []
+
+        async def scenario():
+            limiter = FairLimiter(**kwargs)
+
+            async def one(token):
+                await limiter.acquire(token)
+                order.append(token)
+
+            await asyncio.gather(*(one(token) for token in requests))
+            assert len(limiter) == 0
+
+        started = time.monotonic()
+        asyncio.run(scenario())
+        return order, time.monotonic() - started
+
+    def test_noisy_token_does_not_starve_others(self):
+        order, _ = self.grant_order(['noisy'] * 10 + ['quiet'] * 2)
+        assert order.index('quiet') <= 2, (
+            'Запросы тихого токена не должны ждать всю очередь шумного'
+        )
+        assert order[:5].count('quiet') == 2, (
+            'Ждущие токены обслуживаются по кругу'
+        )
+
+    def test_weighted_round_robin(self):
+        order, _ = self.grant_order(
+            ['a'] * 6 + ['b'] * 3, weights={'a': 2})
+        assert order[1:] == ['a', 'a', 'b', 'a', 'a', 'b', 'a', 'b'], (
+            'За круг токен получает столько слотов, каков его вес'
+        )
+
+    def test_global_rate(self):
+        _, elapsed = self.grant_order(['a', 'b', 'c'] * 10, rate=100)
+        assert elapsed >= 0.25, (
+            'Суммарный поток запросов не должен превышать общий лимит'
+        )
+
+    def test_token_rate(self):
+        order, elapsed = self.grant_order(
+            ['noisy'] * 5 + ['quiet'], rate=10000, burst=10000,
+            token_rate=50, token_burst=1)
+        assert elapsed >= 0.07, 'Токен не должен превышать свой лимит'
+        assert order.index('quiet') == 1, (
+            'Упёршийся в свой лимит токен не задерживает остальных'
+        )
+
+    def test_cancelled_waiter_frees_slot(self):
+        from rate_limit import FairLimiter
+
+        async def scenario():
+            limiter = FairLimiter(rate=50, burst=1)
+            await limiter.acquire('a')
+            waiter = asyncio.create_task(limiter.acquire('a'))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+            assert len(limiter) == 0, 'Отменённый запрос уходит из очереди'
+            await asyncio.wait_for(limiter.acquire('b'), 1)
+
+        asyncio.run(scenario())
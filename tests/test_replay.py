@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+from http import HTTPStatus
+
+import aiohttp
+from stand_in import FakeClock, StandIn
+
+
+def record(monkeypatch, path, rounds=1300, joining=None):
+    """Гоняет движок через RecordingSession против StandIn.
+
+    Подписка joining оформляется на ходу, после первых опросов.
+    """
+    from engine import PollingEngine
+    from replay import RecordingSession, TrafficLog
+    from scheduling import FixedPolicy
+    from tenants import Tenant
+
+    clock = FakeClock()
+    tenants = [Tenant('secret-a', '1'), Tenant('secret-b', '2')]
+
+    def practicum(request):
+        status = 'reviewing' if clock() < 1500 else 'approved'
+        return HTTPStatus.OK, {
+            'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': status}],
+            'current_date': int(clock()),
+        }
+
+    async def scenario():
+        async with StandIn(practicum) as stand_in:
+            stand_in.patch(monkeypatch)
+            traffic = TrafficLog(path, clock=clock)
+            async with aiohttp.ClientSession() as session:
+                engine = PollingEngine(
+                    RecordingSession(session, traffic), 'token', tenants,
+                    retry_time=600, policy=FixedPolicy(600), clock=clock,
+                    traffic=traffic)
+                for number in range(rounds):
+                    if joining is not None and number == rounds // 2:
+                        engine.add_tenant(joining)
+                    delay = engine.run_pending()
+                    await engine.drain()
+                    clock.sleep(delay)
+            traffic.close()
+            return stand_in
+
+    return asyncio.run(scenario())
+
+
+class TestReplay:
+
+    def test_record(self, monkeypatch, tmp_path):
+        from replay import load_traffic
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        stand_in = record(monkeypatch, path)
+        events = load_traffic(path)
+        kinds = [event['k'] for event in events]
+        assert kinds.count('tenant') == 2
+        assert kinds.count('poll') == len(stand_in.calls)
+        assert kinds.count('send') == len(stand_in.sent) == 4
+        with gzip.open(path, 'rt', encoding='utf-8') as traffic:
+            assert 'secret' not in traffic.read(), (
+                'Токены Практикума не должны попадать в журнал'
+            )
+
+    def test_replay_matches_recording(self, monkeypatch, tmp_path):
+        from replay import load_traffic, replay
+        from scheduling import FixedPolicy
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        record(monkeypatch, path)
+        result = asyncio.run(replay(
+            load_traffic(path), retry_time=600, policy=FixedPolicy(600)))
+        assert (result.matched, result.missed, result.extra) == (4, 0, 0), (
+            'Воспроизведение с тем же расписанием даёт те же уведомления'
+        )
+        assert all(abs(delay) < 1 for delay in result.delays)
+        assert result.virtual_seconds > 1000
+        assert result.wall_seconds < result.virtual_seconds
+
+    def test_replay_adds_tenants_at_recorded_time(self, monkeypatch,
+                                                  tmp_path):
+        from replay import load_traffic, replay
+        from scheduling import FixedPolicy
+        from tenants import Tenant
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        stand_in = record(monkeypatch, path, rounds=2600,
+                          joining=Tenant('secret-c', '3'))
+        events = load_traffic(path)
+        assert [event['chat'] for event in events
+                if event['k'] == 'tenant'] == ['1', '2', '3'], (
+            'Подписка, оформленная на ходу, тоже пишется в журнал'
+        )
+        assert '3' in [chat_id for chat_id, _ in stand_in.sent]
+        result = asyncio.run(replay(
+            events, retry_time=600, policy=FixedPolicy(600)))
+        assert (result.missed, result.extra) == (0, 0), (
+            'Отправки подписки, оформленной на ходу, воспроизводятся'
+        )
+
+    def test_slower_schedule_delays_notifications(self, monkeypatch,
+                                                  tmp_path):
+        from replay import load_traffic, replay
+        from scheduling import FixedPolicy
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        record(monkeypatch, path)
+        result = asyncio.run(replay(
+            load_traffic(path), retry_time=600, policy=FixedPolicy(900)))
+        assert result.polls < 8
+        assert max(result.delays) > 0, (
+            'Редкий опрос должен отразиться в задержке уведомлений'
+        )
+
+    def test_truncated_log(self, tmp_path):
+        from replay import TrafficLog, load_traffic
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        traffic = TrafficLog(path, clock=FakeClock())
+        traffic.write('send', chat='1', text='a', status=200)
+        traffic.close()
+        data = path.read_bytes()
+        path.write_bytes(data + data[:len(data) // 2])
+        assert len(load_traffic(path)) == 1, (
+            'Оборванный хвост журнала не мешает прочитать начало'
+        )
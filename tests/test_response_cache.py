@@ -0,0 +1,117 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+from stand_in import run_engine
+
+
+def cache_hits():
+    from metrics import RESPONSE_CACHE
+
+    return RESPONSE_CACHE.value(labels=('hit',))
+
+
+def resolve(cache, *args, parse=None):
+    from homework import parse_homework_statuses
+
+    return asyncio.run(cache.resolve(*args, parse or parse_homework_statuses))
+
+
+class TestResponseCache:
+
+    def body(self, current_date, status='reviewing'):
+        return json.dumps({
+            'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': status}],
+            'current_date': current_date,
+        }).encode()
+
+    def test_same_body_is_not_parsed_again(self):
+        from response_cache import ResponseCache
+
+        from homework import parse_homework_statuses
+
+        cache = ResponseCache()
+        parsed = []
+
+        async def parse(body):
+            parsed.append(body)
+            return await parse_homework_statuses(body)
+
+        first = resolve(cache, 'a', 100, 200, {}, self.body(100), parse=parse)
+        second = resolve(
+            cache, 'a', 100, 200, {}, self.body(200), parse=parse)
+        assert len(parsed) == 1, (
+            'Ответ, отличающийся только current_date, не разбирается'
+        )
+        assert second.fingerprint == first.fingerprint
+        assert second.current_date == 200, (
+            'current_date берётся из нового ответа'
+        )
+        third = resolve(
+            cache, 'a', 200, 200, {}, self.body(300, 'approved'), parse=parse)
+        assert len(parsed) == 2
+        assert third.fingerprint != first.fingerprint
+
+    def test_conditional_headers(self):
+        from response_cache import ResponseCache
+
+        cache = ResponseCache()
+        cached = resolve(
+            cache, 'a', 100, 200,
+            {'ETag': '"v1"', 'Last-Modified': 'yesterday'}, self.body(100))
+        assert cache.conditional_headers('a', 100) == {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'yesterday'}
+        assert cache.conditional_headers('a', 200) == {}, (
+            'Валидаторы годятся только для того же from_date'
+        )
+        assert cache.conditional_headers('b', 100) == {}
+        assert resolve(
+            cache, 'a', 100, HTTPStatus.NOT_MODIFIED, {},
+            b'') is cached, '304 возвращает ответ из кэша'
+
+    def test_keeps_only_compact_records(self):
+        from models import Homework, Status
+        from response_cache import ResponseCache
+
+        body = json.dumps({
+            'homeworks': [{'id': 1, 'homework_name': 'hw',
+                           'status': 'rejected',
+                           'reviewer_comment': 'x' * 10_000}],
+            'current_date': 100,
+        }).encode()
+        cached = resolve(ResponseCache(), 'a', 100, 200, {}, body)
+        assert cached.homeworks == (Homework(1, 'hw', Status.REJECTED),), (
+            'В кэше остаются только записи Homework без лишних полей'
+        )
+        assert cached.current_date == 100
+
+    def test_eviction(self):
+        from response_cache import ResponseCache
+
+        cache = ResponseCache(max_entries=2)
+        for token in 'abc':
+            resolve(cache, token, 1, 200, {}, self.body(1))
+        assert len(cache) == 2
+        assert list(cache._entries) == ['b', 'c'], (
+            'Вытесняется самый давний токен'
+        )
+
+    def test_engine_skips_unchanged_responses(self, monkeypatch):
+        from tenants import Tenant
+
+        def practicum(request):
+            from_date = int(request.query['from_date'])
+            return HTTPStatus.OK, {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'reviewing'}],
+                'current_date': from_date + 100,
+            }
+
+        before = cache_hits()
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, [Tenant('a', '1'), Tenant('a', '2')],
+            rounds=1300)
+        assert cache_hits() > before, 'Повторный ответ берётся из кэша'
+        assert sorted(chat for chat, _ in stand_in.sent) == ['1', '2'], (
+            'Каждый чат с тем же токеном получает статус ровно один раз'
+        )
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+import pytest
+from stand_in import run_engine
+
+
+def policy(**kwargs):
+    from scheduling import AdaptivePolicy
+
+    kwargs.setdefault('random', lambda: 0.5)
+    return AdaptivePolicy(
+        retry_time=600, reviewing_time=120, idle_after=2, idle_time=1800,
+        max_error_time=3600, **kwargs)
+
+
+class TestAdaptivePolicy:
+
+    def test_errors_back_off_exponentially(self):
+        from scheduling import TenantState
+
+        state = TenantState()
+        delays = []
+        for _ in range(5):
+            state.record_error()
+            delays.append(policy().next_delay(state))
+        assert delays == [600, 1200, 2400, 3600, 3600], (
+            'После ошибок пауза должна расти экспоненциально от обычной '
+            'до потолка'
+        )
+        state.record_success([])
+        assert policy().next_delay(state) == 600
+
+    def test_reviewing_polls_faster(self):
+        from models import Status
+        from scheduling import TenantState
+
+        state = TenantState()
+        state.record_success([('hw', Status.REVIEWING)])
+        for _ in range(5):
+            state.record_success([])
+        assert policy().next_delay(state) == 120, (
+            'Пока работа на ревью, опрос должен идти чаще'
+        )
+        state.record_success([('hw', Status.APPROVED)])
+        assert policy().next_delay(state) == 600
+
+    def test_idle_tenant_slows_down(self):
+        from scheduling import TenantState
+
+        state = TenantState()
+        state.record_success([])
+        assert policy().next_delay(state) == 600
+        state.record_success([])
+        assert policy().next_delay(state) == 1800
+
+    @pytest.mark.parametrize('value, expected', [(0, 540), (1, 660)])
+    def test_jitter(self, value, expected):
+        from scheduling import TenantState
+
+        delay = policy(random=lambda: value).next_delay(TenantState())
+        assert delay == pytest.approx(expected)
+
+
+class TestEngineScheduling:
+
+    def test_engine_backs_off_on_errors(self, monkeypatch):
+        from tenants import Tenant
+
+        def practicum(request):
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {}
+
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, [Tenant('a', '1')], rounds=2000,
+            policy=policy())
+        # Опросы в 1000, 1600 и 2800: паузы 600 и 1200, а не чаще обычного.
+        assert len(stand_in.calls) == 3
@@ -0,0 +1,203 @@
+import json
+
+from stand_in import FakeClock
+
+
+class FakeProcess:
+
+    def __init__(self, shard, alive):
+        self.shard = shard
+        self.alive = alive
+        self.running = False
+        self.exitcode = None
+
+    def start(self):
+        self.running = True
+
+    def is_alive(self):
+        return self.running
+
+    def crash(self):
+        self.running = False
+        self.exitcode = 1
+
+
+class FakeProcesses:
+
+    def __init__(self):
+        self.started = []
+
+    def __call__(self, shard, alive, connection, options):
+        process = FakeProcess(shard, alive)
+        process.connection = connection
+        self.started.append(process)
+        return process
+
+    def current(self, shard):
+        return [p for p in self.started if p.shard == shard][-1]
+
+
+class TestHashRing:
+
+    def test_spreads_keys(self):
+        from sharding import HashRing
+
+        ring = HashRing(range(4))
+        counts = {}
+        for key in range(4000):
+            node = ring.node_for(f'tenant-{key}')
+            counts[node] = counts.get(node, 0) + 1
+        assert sorted(counts) == [0, 1, 2, 3], (
+            'Каждый шард должен получить свою долю подписок'
+        )
+        assert min(counts.values()) > 600, (
+            'Подписки должны раскладываться по шардам примерно поровну'
+        )
+
+    def test_removal_moves_only_its_keys(self):
+        from sharding import HashRing
+
+        before = HashRing(range(4))
+        after = HashRing([0, 1, 3])
+        for key in range(2000):
+            key = f'tenant-{key}'
+            if before.node_for(key) != 2:
+                assert after.node_for(key) == before.node_for(key), (
+                    'При выводе шарда остальные подписки не должны '
+                    'переезжать'
+                )
+
+
+class TestSupervisor:
+
+    def make(self, shards=2):
+        from sharding import Supervisor
+
+        clock = FakeClock(1000)
+        processes = FakeProcesses()
+        supervisor = Supervisor(
+            shards, {}, process_factory=processes, clock=clock)
+        supervisor.start()
+        return supervisor, processes, clock
+
+    def test_restarts_crashed_shard(self):
+        supervisor, processes, clock = self.make()
+        processes.current(1).crash()
+        supervisor.check()
+        assert len(processes.started) == 2, (
+            'Шард перезапускается после паузы, а не сразу'
+        )
+        clock.sleep(1)
+        supervisor.check()
+        assert processes.current(1).running, (
+            'Упавший шард должен быть перезапущен'
+        )
+        assert len(processes.started) == 3
+
+    def test_retires_flapping_shard(self):
+        from sharding import MAX_RESTARTS
+
+        supervisor, processes, clock = self.make(shards=3)
+        for _ in range(MAX_RESTARTS):
+            processes.current(2).crash()
+            supervisor.check()
+            clock.sleep(60)
+            supervisor.check()
+        assert supervisor.alive == [0, 1], (
+            'Часто падающий шард должен быть выведен из кольца'
+        )
+        for shard in (0, 1):
+            connection = processes.current(shard).connection
+            assert connection.poll(), (
+                'Живые шарды должны получить новый состав кольца'
+            )
+            assert connection.recv() == [0, 1]
+
+
+class TestShardTenants:
+
+    def test_adopts_cursors_of_moved_tenants(self, tmp_path):
+        from cursors import CursorStore
+        from sharding import HashRing, ShardTenants
+        from tenants import Tenant
+
+        tenants = [Tenant(f'token-{i}', i) for i in range(40)]
+        ring = HashRing([0, 1])
+        moved = [t for t in tenants if ring.node_for(t.token_id) == 1]
+        (tmp_path / 'cursors-1.json').write_text(
+            json.dumps({tenant.token_id: 777 for tenant in moved}))
+
+        class Engine:
+            retry_time = 600
+
+            def __init__(self):
+                self.cursors = CursorStore()
+                self.tenants = []
+                self.delays = []
+
+            def add_tenant(self, tenant, delay=0):
+                self.tenants.append(tenant)
+                self.delays.append(delay)
+
+        engine = Engine()
+        shard = ShardTenants(0, tenants, str(tmp_path))
+        shard.adopt(engine, shard.owned([0]))
+        assert len(engine.tenants) == len(tenants), (
+            'Единственный живой шард должен забрать все подписки'
+        )
+        assert len(set(engine.delays)) == len(tenants), (
+            'Первые опросы забранных подписок разносятся по интервалу'
+        )
+        for tenant in moved:
+            assert engine.cursors.get(tenant.token_id) == 777, (
+                'Курсор переехавшей подписки берётся у прежнего шарда'
+            )
+
+
+class TestRunShard:
+
+    def test_main_rejects_unsupported_options(self, monkeypatch):
+        import config
+        import homework
+        import sharding
+
+        supervised = []
+        monkeypatch.setattr(sharding, 'supervise', supervised.append)
+        monkeypatch.setattr(homework, 'configure_logging', lambda c: None)
+        for name in ('STORE_FILE', 'RECORD_FILE'):
+            environ = {'TENANTS_FILE': 'tenants.json', 'TELEGRAM_TOKEN': 't',
+                       'SHARDS': '2', name: 'file'}
+            monkeypatch.setattr(config, 'load_config',
+                                lambda: config.Config.from_env(environ))
+            assert homework.main() == 1, (
+                f'{name} не работает с шардами: запуск должен прерваться'
+            )
+        assert supervised == []
+
+    def test_shards_split_rate_limits(self, monkeypatch, tmp_path):
+        import engine
+        import homework
+        from config import Config
+        from delivery import GLOBAL_RATE
+        from rate_limit import PRACTICUM_RATE
+        from sharding import run_shard
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps(
+            [{'practicum_token': 'a', 'chat_id': 1}]))
+        served = {}
+
+        async def serve(*args, **kwargs):
+            served.update(kwargs)
+
+        monkeypatch.setattr(engine, 'serve', serve)
+        monkeypatch.setattr(homework, 'configure_logging', lambda c: None)
+        config = Config(tenants_file=str(path), shards=4,
+                        cursors_file=str(tmp_path / 'cursors.json'))
+        run_shard(0, [0, 1, 2, 3], None, config)
+        assert served['practicum_rate'] == PRACTICUM_RATE / 4, (
+            'Шарды должны делить общий лимит запросов к Практикуму'
+        )
+        assert served['telegram_rate'] == GLOBAL_RATE / 4, (
+            'Шарды должны делить общий лимит отправок одного бота'
+        )
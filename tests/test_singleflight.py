@@ -0,0 +1,73 @@
+import asyncio
+from http import HTTPStatus
+
+import aiohttp
+from stand_in import StandIn
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_flight(self):
+        from singleflight import SingleFlight
+
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return {'homeworks': []}
+
+        async def scenario():
+            flights = SingleFlight()
+            results = await asyncio.gather(
+                *(flights.do(('token', 1), fetch) for _ in range(3)))
+            await flights.do(('token', 1), fetch)
+            return flights, results
+
+        flights, results = asyncio.run(scenario())
+        assert len(calls) == 2, (
+            'Одновременные одинаковые запросы должны идти одним, '
+            'а следующий после завершения — новым'
+        )
+        assert results[0] is results[1] is results[2]
+        assert (flights.started, flights.shared) == (2, 2)
+        assert len(flights) == 0
+
+    def test_error_is_shared(self):
+        from singleflight import SingleFlight
+
+        async def fetch():
+            await asyncio.sleep(0)
+            raise ConnectionError('Сбой')
+
+        async def scenario():
+            flights = SingleFlight()
+            return await asyncio.gather(
+                flights.do('key', fetch), flights.do('key', fetch),
+                return_exceptions=True)
+
+        errors = asyncio.run(scenario())
+        assert all(isinstance(error, ConnectionError) for error in errors)
+
+    def test_engine_coalesces_same_token(self, monkeypatch):
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        def practicum(request):
+            return HTTPStatus.OK, {'homeworks': [], 'current_date': 1}
+
+        async def scenario():
+            async with StandIn(practicum) as stand_in:
+                stand_in.patch(monkeypatch)
+                async with aiohttp.ClientSession() as session:
+                    engine = PollingEngine(session, 'token', [])
+                    await asyncio.gather(
+                        engine.fetch(Tenant('secret', '1'), 100),
+                        engine.fetch(Tenant('secret', '2'), 100),
+                        engine.fetch(Tenant('other', '3'), 100))
+            return stand_in
+
+        stand_in = asyncio.run(scenario())
+        assert sorted(stand_in.calls) == ['OAuth other', 'OAuth secret'], (
+            'Ментор и ученик с одним токеном должны делить один запрос'
+        )
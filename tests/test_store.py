@@ -0,0 +1,242 @@
+from http import HTTPStatus
+
+from stand_in import run_engine
+
+
+def make_store(tmp_path, *tenants):
+    from store import SqliteStore
+
+    store = SqliteStore(str(tmp_path / 'bot.sqlite3'))
+    for tenant in tenants:
+        store.add_tenant(tenant)
+    store.commit()
+    return store
+
+
+class TestSqliteStore:
+
+    def test_wal_and_batched_writes(self, tmp_path):
+        from store import SqliteStore
+        from tenants import Tenant
+
+        tenant = Tenant('a', '1')
+        store = make_store(tmp_path, tenant)
+        assert store._db.execute(
+            'PRAGMA journal_mode').fetchone()[0] == 'wal'
+        store.advance(tenant.token_id, 1200)
+        reader = SqliteStore(store.path)
+        assert reader.load_cursors() == {}, (
+            'Записи должны копиться до commit()'
+        )
+        store.commit()
+        assert reader.load_cursors() == {tenant.token_id: 1200}
+        store.advance(tenant.token_id, 1100)
+        store.commit()
+        assert reader.load_cursors() == {tenant.token_id: 1200}, (
+            'Курсор не должен откатываться назад'
+        )
+
+    def test_outbox_pending_per_chat(self, tmp_path):
+        store = make_store(tmp_path)
+        store.enqueue_message('1', 'a', key='a')
+        store.enqueue_message('2', 'b', key='b')
+        store.enqueue_message('2', 'b', key='b')
+        store.commit()
+        assert store.pending_messages() == [(1, '1', 'a'), (2, '2', 'b')], (
+            'Сообщение с известным ключом не должно записываться дважды'
+        )
+        store.mark_delivered([1])
+        store.commit()
+        assert store.pending_messages('1') == []
+        assert store.pending_messages(after=1) == [(2, '2', 'b')]
+        plan = ' '.join(row[-1] for row in store._db.execute(
+            'EXPLAIN QUERY PLAN SELECT id, text FROM outbox '
+            "WHERE chat_id = '1' AND delivered_at IS NULL ORDER BY id"))
+        assert 'outbox_pending' in plan
+
+    def test_outbox_retention(self, tmp_path):
+        from stand_in import FakeClock
+        from store import PRUNE_INTERVAL, SqliteStore
+
+        clock = FakeClock()
+        store = SqliteStore(str(tmp_path / 'bot.sqlite3'), clock=clock,
+                            outbox_retention=100)
+        for key in 'abc':
+            store.enqueue_message('1', key, key=key)
+        store.commit()
+        store.mark_delivered([1])
+        store.mark_failed([2])
+        store.commit()
+        clock.sleep(PRUNE_INTERVAL)
+        store.commit()
+        assert store.pending_messages() == [(3, '1', 'c')]
+        assert store._db.execute(
+            'SELECT COUNT(*) FROM outbox').fetchone() == (1,), (
+            'Доставленные и отброшенные сообщения удаляются из outbox '
+            'после срока хранения'
+        )
+
+    def test_registry(self, tmp_path):
+        from store import SqliteStore, SqliteTenantRegistry
+        from tenants import Tenant
+
+        store = make_store(tmp_path)
+        registry = SqliteTenantRegistry(store)
+        assert registry.add(Tenant('a', '1'))
+        assert not registry.add(Tenant('a', '1'))
+        registry.add(Tenant('b', '2'))
+        registry.remove_chat('2')
+        reloaded = SqliteTenantRegistry(SqliteStore(store.path))
+        assert list(reloaded) == [Tenant('a', '1')], (
+            'Изменения реестра должны сохраняться в базе'
+        )
+
+    def test_sync_with_tenants_file(self, tmp_path):
+        from store import SqliteStore, SqliteTenantRegistry
+        from tenants import Tenant
+
+        store = make_store(tmp_path)
+        kept, dropped = Tenant('a', '1'), Tenant('b', '2')
+        bot = Tenant('c', '3')
+        SqliteTenantRegistry.sync(store, [kept, dropped])
+        SqliteTenantRegistry(store).add(bot)
+        store.close()
+        # Пока бот не работал, подписку b убрали из файла.
+        restarted = SqliteTenantRegistry.sync(
+            SqliteStore(store.path), [kept])
+        assert list(restarted) == [kept, bot], (
+            'При запуске снимаются подписки, удалённые из файла, '
+            'а подписки от /start остаются'
+        )
+
+
+class TestEngineStore:
+
+    def run(self, monkeypatch, path, tenant, prepare=None):
+        from state_cache import HomeworkStateCache
+        from store import SqliteCursorStore, SqliteStore
+
+        def practicum(request):
+            return HTTPStatus.OK, {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': int(request.query['from_date']),
+            }
+
+        store = SqliteStore(path)
+        store.add_tenant(tenant)
+        if prepare is not None:
+            prepare(store)
+        store.commit()
+        stand_in, _ = run_engine(
+            monkeypatch, practicum, [tenant], rounds=1, store=store,
+            cursors=SqliteCursorStore(store),
+            states=HomeworkStateCache(store=store))
+        store.close()
+        return stand_in
+
+    def test_statuses_survive_restart(self, monkeypatch, tmp_path):
+        from tenants import Tenant
+
+        tenant = Tenant('a', '1')
+        path = str(tmp_path / 'bot.sqlite3')
+        first = self.run(monkeypatch, path, tenant)
+        second = self.run(
+            monkeypatch, path, tenant,
+            prepare=lambda store: store.schedule(tenant.token_id, 0))
+        assert len(second.calls) == 1
+        assert len(first.sent) == 1 and second.sent == [], (
+            'После перезапуска известный статус не сообщается повторно'
+        )
+
+    def test_schedule_survives_restart(self, monkeypatch, tmp_path):
+        from store import SqliteStore
+        from tenants import Tenant
+
+        tenant = Tenant('a', '1')
+        path = str(tmp_path / 'bot.sqlite3')
+        self.run(monkeypatch, path, tenant)
+        assert SqliteStore(path).schedules() == {tenant.token_id: 1601}
+        second = self.run(monkeypatch, path, tenant)
+        assert second.calls == [], (
+            'После перезапуска опрос продолжается по сохранённому сроку'
+        )
+
+    def test_schedule_loaded_in_one_query(self, tmp_path):
+        from engine import PollingEngine
+        from stand_in import FakeClock
+        from tenants import Tenant
+
+        tenants = [Tenant(f'token-{i}', i) for i in range(50)]
+        store = make_store(tmp_path, *tenants)
+        for tenant in tenants:
+            store.schedule(tenant.token_id, 5000)
+        store.commit()
+        queries = []
+        store._db.set_trace_callback(queries.append)
+        engine = PollingEngine(None, 'token', tenants, clock=FakeClock(),
+                               store=store)
+        assert len([q for q in queries if 'FROM feeds' in q]) == 1, (
+            'Сроки опросов при запуске читаются одним запросом'
+        )
+        assert engine.next_poll_at() == 5000
+
+    def test_restart_after_downtime_keeps_spread(self, tmp_path):
+        from engine import PollingEngine
+        from stand_in import FakeClock
+        from tenants import Tenant
+
+        tenants = [Tenant(f'token-{i}', i) for i in range(10)]
+        store = make_store(tmp_path, *tenants)
+        clock = FakeClock()
+        first = PollingEngine(None, 'token', tenants, clock=clock,
+                              store=store)
+        for due, _, feed in first._queue:
+            store.schedule(feed.id, due)
+        store.commit()
+        clock.sleep(24 * 60 * 60)
+        now = clock()
+        engine = PollingEngine(None, 'token', tenants, clock=clock,
+                               store=store)
+        offsets = sorted(due - now for due, _, _ in engine._queue)
+        assert offsets == [60 * number for number in range(10)], (
+            'После долгого простоя опросы не должны сходиться '
+            'в один момент'
+        )
+
+    def test_transition_goes_through_outbox(self, monkeypatch, tmp_path):
+        from store import SqliteStore
+        from tenants import Tenant
+
+        tenant = Tenant('a', '1')
+        path = str(tmp_path / 'bot.sqlite3')
+        stand_in = self.run(monkeypatch, path, tenant)
+        assert len(stand_in.sent) == 1
+        rows = SqliteStore(path)._db.execute(
+            'SELECT key, delivered_at FROM outbox').fetchall()
+        assert len(rows) == 1 and rows[0][0].startswith(tenant.id), (
+            'Переход статуса пишется в outbox с ключом идемпотентности'
+        )
+        assert rows[0][1] is not None, (
+            'После отправки сообщение подтверждается в outbox'
+        )
+
+    def test_pending_messages_sent_after_restart(self, monkeypatch,
+                                                 tmp_path):
+        from tenants import Tenant
+
+        tenant = Tenant('a', '1')
+        path = str(tmp_path / 'bot.sqlite3')
+
+        def crashed_before_send(store):
+            # Прошлый процесс записал переход и упал до отправки.
+            store.enqueue_message('1', 'неотправленное', key='k')
+            store.schedule(tenant.token_id, 10_000)
+
+        stand_in = self.run(monkeypatch, path, tenant,
+                            prepare=crashed_before_send)
+        assert stand_in.sent == [('1', 'неотправленное')], (
+            'Неподтверждённые сообщения отправляются после перезапуска'
+        )
+        again = self.run(monkeypatch, path, tenant)
+        assert again.sent == [], 'Подтверждённое сообщение не повторяется'
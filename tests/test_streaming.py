@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+
+def read(payload, chunk_size=1):
+    from homework import parse_homework_statuses
+
+    data = payload.encode() if isinstance(payload, str) else payload
+    return asyncio.run(parse_homework_statuses(data, chunk_size))
+
+
+class TestStreamingParse:
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+    def test_matches_full_parse(self, chunk_size):
+        data = {
+            'current_date': 1581604970,
+            'homeworks': [
+                {'id': 124, 'status': 'rejected',
+                 'homework_name': 'username__hw_python_oop.zip',
+                 'reviewer_comment': 'Код не по PEP8 — «исправьте»',
+                 'date_updated': '2020-02-13T16:42:47Z',
+                 'lesson_name': 'Итоговый проект'},
+                {'id': 123, 'status': 'approved',
+                 'homework_name': 'username__hw_test.zip',
+                 'reviewer_comment': {'nested': [1, 2.5, None, True]}},
+            ],
+        }
+        from models import Homework, Status
+
+        result = read(json.dumps(data, ensure_ascii=False), chunk_size)
+        assert result == {
+            'homeworks': [
+                Homework(124, 'username__hw_python_oop.zip', Status.REJECTED),
+                Homework(123, 'username__hw_test.zip', Status.APPROVED),
+            ],
+            'current_date': 1581604970,
+        }, (
+            'Потоковый разбор должен давать те же работы, '
+            'что и response.json()'
+        )
+
+    def test_empty_homeworks(self):
+        assert read('{"homeworks": [], "current_date": 12345}') == {
+            'homeworks': [], 'current_date': 12345}
+
+    @pytest.mark.parametrize('payload', [
+        '[{"homeworks": []}]',
+        '{"current_date": 1}',
+        '{}',
+        '{"homeworks": null}',
+        '{"homeworks": {"homework_name": "hw", "status": "approved"}}',
+        '{"homeworks": ["hw"]}',
+    ])
+    def test_invalid_structure(self, payload):
+        with pytest.raises(TypeError):
+            read(payload)
+
+    @pytest.mark.parametrize('homework', [
+        {'homework_name': 'hw'},
+        {'status': 'approved'},
+    ])
+    def test_missing_keys(self, homework):
+        with pytest.raises(KeyError):
+            read(json.dumps({'homeworks': [homework]}))
+
+    @pytest.mark.parametrize('payload', [
+        '', '{"homeworks": [', '{"homeworks": [] "x": 1}', 'not json',
+    ])
+    def test_broken_json(self, payload):
+        with pytest.raises(json.JSONDecodeError):
+            read(payload)